@@ -0,0 +1,112 @@
+import csv
+import json
+import math
+
+# Metrics of a benchmark run, computed per model from the results of process_file (see run_benchmark.py):
+# - retrieval, for each k: recall@k (the ratio of the keywords whose expected match is found among the first k results) and
+#   MRR@k (the mean reciprocal rank of the expected match, 0 when it is not found among the first k results), all the values
+#   of k being computed from the same ranked results,
+# - performance: the latency percentiles of the queries (only when each query is searched by its own call, the latency of a
+#   query searched in a batch being unknown), the number of queries per second of wall-clock time, and the mean duration per
+#   query of each stage of the searches (embedding, collection query, fetching of the partner documents).
+
+stages = ['embed', 'query', 'partner']
+
+def percentile(values: list[float], p: float) -> float|None:
+    """
+    Return a percentile of some values (nearest-rank method).
+
+    Args:
+        values: The values.
+        p: The percentile (between 0 and 100).
+
+    Returns:
+        The percentile, None if there is no value.
+    """
+    if values == []:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def compute_metrics(results: dict[int, dict], timings: dict[str, list[dict[str, float]]], k_values: list[int]) -> dict[str, dict]:
+    """
+    Compute the metrics of each model.
+
+    Args:
+        results: The results of the benchmark, as returned by process_file.
+        timings: For each model, the timings of its search calls, as dictionaries containing the number of 'queries' of the call,
+                 its 'start' and 'end' times, its 'total' duration, and the durations of its stages (in seconds).
+        k_values: The values of k for which recall@k and MRR@k are computed (they must not exceed the number of matches returned per query).
+
+    Returns:
+        For each model, a dictionary containing the number of 'queries', the 'recall@k' and 'mrr@k' of each k, the number of
+        'calls', the 'qps' (over the wall-clock time between the start of the first call and the end of the last one),
+        the 'latency_p50', 'latency_p95', and 'latency_p99' of the queries (in milliseconds, None if some calls search several queries),
+        and the mean duration per query (in milliseconds) of each stage ('embed_time', 'query_time', and 'partner_time').
+    """
+    models = sorted({ model for data in results.values() for model in data['results'] })
+    metrics = {}
+    for model in models:
+        ranks = [data['results'][model]['success'] for data in results.values() if model in data['results']]
+        calls = timings.get(model, [])
+        # the calls of a model may run simultaneously
+        wall_time = max(call['end'] for call in calls) - min(call['start'] for call in calls) if calls else 0.0
+        latencies = [call['total'] * 1000 for call in calls] if all(call['queries'] == 1 for call in calls) else []
+        model_metrics: dict = { 'queries': len(ranks) }
+        for k in k_values:
+            model_metrics[f'recall@{k}'] = sum(1 for rank in ranks if 0 <= rank < k) / len(ranks) if ranks else None
+            model_metrics[f'mrr@{k}'] = sum(1 / (rank + 1) for rank in ranks if 0 <= rank < k) / len(ranks) if ranks else None
+        model_metrics.update({
+            'calls': len(calls),
+            'qps': len(ranks) / wall_time if wall_time > 0 else None,
+            'latency_p50': percentile(latencies, 50),
+            'latency_p95': percentile(latencies, 95),
+            'latency_p99': percentile(latencies, 99)
+        })
+        for stage in stages:
+            stage_time = sum(call.get(stage, 0.0) for call in calls)
+            model_metrics[f'{stage}_time'] = stage_time * 1000 / len(ranks) if ranks else None
+        metrics[model] = model_metrics
+    return metrics
+
+def write_metrics(file_path: str, metrics: dict[str, dict], info: dict) -> None:
+    """
+    Write the metrics in a JSON file or, if the file extension is `.csv`, in a CSV file (one row per model).
+
+    Args:
+        file_path: The path of the file.
+        metrics: The metrics, as returned by compute_metrics.
+        info: The description of the run (e.g. benchmark file and date), stored with the metrics
+              (in the CSV file, it is repeated on each row).
+    """
+    if file_path.lower().endswith('.csv'):
+        write_csv(file_path, [{ **info, 'model': model, **model_metrics } for model, model_metrics in metrics.items()], list(info.keys()) + ['model'])
+    else:
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump({ **info, 'models': metrics }, file, indent=2)
+
+def write_suite_metrics(file_path: str, runs: list[dict], info: dict) -> None:
+    """
+    Write the metrics of several benchmark runs in a JSON file or, if the file extension is `.csv`, in a CSV file (one row per run).
+
+    Args:
+        file_path: The path of the file.
+        runs: The runs, each one being a dictionary describing the run (e.g. library, benchmark, and model) and containing its metrics.
+        info: The description of the suite (e.g. date), stored with the metrics (in the CSV file, it is repeated on each row).
+    """
+    if file_path.lower().endswith('.csv'):
+        write_csv(file_path, [{ **info, **run } for run in runs], list(info.keys()))
+    else:
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump({ **info, 'runs': runs }, file, indent=2)
+
+def write_csv(file_path: str, rows: list[dict], default_fieldnames: list[str]) -> None:
+    """
+    Write some rows in a CSV file, the columns are those of all the rows (default_fieldnames if there is no row).
+    """
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row)) if rows else default_fieldnames
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
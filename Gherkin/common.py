@@ -1,4 +1,11 @@
+import hashlib
+import itertools
 import re
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+keyword_types = ["Context", "Action", "Outcome"]
 
 ### parse model@host
 
@@ -43,7 +50,7 @@ def get_collection_name(model_id: int, project: str, keyword_type: str) -> str:
     """
     if not re.match("^[a-zA-Z0-9_]*$", project):
         raise ValueError(f"Error: Project name ({project}) can only contain characters, digits, or underscores.")
-    if keyword_type not in ["Context", "Action", "Outcome"]:
+    if keyword_type not in keyword_types:
         raise ValueError(f"Error: Keyword type ({keyword_type}) can only be 'Context', 'Action', or 'Outcome'.")
     return f"{model_id}-{project}-{keyword_type}"
 
@@ -115,3 +122,100 @@ def get_internal_id_of_keyword(internal_description_id: str) -> str:
         raise ValueError("Not id of a description")
     return f"{get_external_id(internal_description_id)}-k"
 
+def get_internal_id_of_partner(internal_id: str) -> str:
+    """
+    Get the internal id of the partner of a document: the description of a keyword or the keyword of a description.
+
+    Args:
+        internal_id: The internal id of the keyword or of the description.
+
+    Returns:
+        The internal id of the partner document.
+    """
+    if get_document_type(internal_id) == 'keyword':
+        return get_internal_id_of_description(internal_id)
+    return get_internal_id_of_keyword(internal_id)
+
+#### management of document contents
+
+def split_into_batches(texts: list[str], max_batch_size: int, max_payload_size: int) -> list[list[str]]:
+    """
+    Split a list of texts into consecutive batches respecting a maximum number of texts and a maximum payload size.
+    A text which is by itself larger than the maximum payload size gets its own batch.
+
+    Args:
+        texts: The texts.
+        max_batch_size: The maximum number of texts in a batch.
+        max_payload_size: The maximum total size (in UTF-8 bytes) of the texts of a batch.
+
+    Returns:
+        The batches, in the order of the texts.
+    """
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    batch_size = 0
+    for text in texts:
+        size = len(text.encode('utf-8'))
+        if batch and ((len(batch) >= max_batch_size) or (batch_size + size > max_payload_size)):
+            batches.append(batch)
+            batch = []
+            batch_size = 0
+        batch.append(text)
+        batch_size += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+def split_into_chunks(items: Iterable[T], chunk_size: int) -> Iterator[list[T]]:
+    """
+    Split some items, which may be read lazily, into chunks of a fixed size (the last one may be smaller).
+
+    Args:
+        items: The items.
+        chunk_size: The number of items per chunk.
+
+    Returns:
+        An iterator over the chunks.
+
+    Raises:
+        ValueError: If the chunk size is lower than 1.
+    """
+    # checked before returning the generator, so that an invalid size is reported by the call itself
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+    return _generate_chunks(iter(items), chunk_size)
+
+def _generate_chunks(iterator: Iterator[T], chunk_size: int) -> Iterator[list[T]]:
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if chunk == []:
+            return
+        yield chunk
+
+def get_content_hash(text: str) -> str:
+    """
+    Return the hash of the text of a document, used to detect whether a document has changed since it has been embedded.
+
+    Args:
+        text: The text of the document.
+
+    Returns:
+        The SHA-256 hash of the text, as an hexadecimal string.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def get_collection_fingerprint(ids: list[str], documents: list[str], metadatas: list) -> str:
+    """
+    Return a fingerprint of the content of a collection, which changes whenever a document is added, modified, or deleted.
+    The hash stored in the metadata of a document is used when it exists, otherwise the text of the document is hashed.
+
+    Args:
+        ids: The ids of the documents.
+        documents: The texts of the documents.
+        metadatas: The metadatas of the documents.
+
+    Returns:
+        The fingerprint, as an hexadecimal string.
+    """
+    hashes = sorted(f"{id}:{(metadata or {}).get('hash') or get_content_hash(document)}" for id, document, metadata in zip(ids, documents, metadatas))
+    return get_content_hash('\n'.join(hashes))
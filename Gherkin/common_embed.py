@@ -1,33 +1,37 @@
 import requests
 import json
 import os
+from abc import ABC, abstractmethod
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Mapping
 
 from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 from chromadb.utils.embedding_functions.sentence_transformer_embedding_function import SentenceTransformerEmbeddingFunction
 
+import common
+import http_transport
+from embedding_cache import EmbeddingCache
+
 def get_envvar(name: str) -> str:
     val = os.getenv(name)
     if val is None:
         raise Exception(f"Environment variable {name} is not set")
     return val.strip()
 
-def call_server(url: str, token: str|None, payload: Any) -> Any:
-
+def build_headers(token: str|None) -> dict[str, str]:
     headers = {"Content-Type": "application/json"}
     if token is not None:
         headers["Authorization"] = f"Bearer {token}"
+    return headers
 
+def parse_response(url: str, response: requests.Response) -> Any:
     try:
-        response = requests.post(url, headers=headers, json=payload)
         response.raise_for_status()
     except requests.exceptions.HTTPError as e:
         error_message = response.text
         print(url + "\nreturned error\n" + error_message, flush=True)
         raise Exception("Model failed") from e
-    except Exception as e:
-        print(url + "\nfailed with exception\n" + str(e), flush=True)
-        raise Exception("An error occurred") from e
     txt = response.text
     jsonz = {}
     try:
@@ -37,11 +41,69 @@ def call_server(url: str, token: str|None, payload: Any) -> Any:
         raise Exception(f"Error while trying to extract JSON from \"{txt}\", problem is: " + str(e)) from e
     return jsonz
 
-class CohereEmbeddingFunction(EmbeddingFunction[Documents]):
+def call_server(url: str, token: str|None, payload: Any) -> Any:
+
+    try:
+        response = http_transport.default_transport.post(url, build_headers(token), payload)
+    except Exception as e:
+        print(url + "\nfailed with exception\n" + str(e), flush=True)
+        raise Exception("An error occurred") from e
+    return parse_response(url, response)
+
+class RemoteEmbeddingFunction(EmbeddingFunction[Documents], ABC):
+    """
+    Embedding function calling an embedding host.
+    The subclasses define the request to send and how to extract the embeddings from the answer,
+    and the limits of the host: the documents are split into batches respecting these limits,
+    the batches are sent in parallel (up to max_concurrency requests at once), and the embeddings are reassembled in order.
+    """
+    max_concurrency = 4
+
     def __init__(self, model: str):
         self.model = model
 
+    @property
+    @abstractmethod
+    def max_batch_size(self) -> int:
+        """
+        The maximum number of documents of a request (the subclasses define it as a class attribute).
+        """
+
+    @property
+    @abstractmethod
+    def max_payload_size(self) -> int:
+        """
+        The maximum total size (in bytes, UTF-8 encoded) of the documents of a request (the subclasses define it as a class attribute).
+        """
+
+    @abstractmethod
+    def build_request(self, input: Documents) -> tuple[str, str|None, Any]:
+        """
+        Return the URL, the token (None if it is in the URL), and the payload of the request embedding some documents.
+        """
+
+    @abstractmethod
+    def extract_embeddings(self, result: Any) -> Embeddings:
+        """
+        Return the embeddings contained in the answer of the host.
+        """
+
     def __call__(self, input: Documents) -> Embeddings:
+        batches = common.split_into_batches(list(input), self.max_batch_size, self.max_payload_size)
+        if len(batches) <= 1:
+            return self._embed_batch(input)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return [embedding for embeddings in executor.map(self._embed_batch, batches) for embedding in embeddings]
+
+    def _embed_batch(self, input: Documents) -> Embeddings:
+        url, token, payload = self.build_request(input)
+        return self.extract_embeddings(call_server(url, token, payload))
+
+class CohereEmbeddingFunction(RemoteEmbeddingFunction):
+    # the API accepts at most 96 texts per request, the payload size is not documented
+    max_batch_size = 96
+    max_payload_size = 1024 * 1024
+    def build_request(self, input: Documents) -> tuple[str, str|None, Any]:
         # see https://docs.litellm.ai/docs/embedding/supported_embedding#cohere-embedding-models
         url = "https://api.cohere.ai/v1/embed"
         token = get_envvar("COHERE_API_KEY")
@@ -50,15 +112,16 @@ class CohereEmbeddingFunction(EmbeddingFunction[Documents]):
              "texts": input, 
              "input_type": "search_document"
             }
+        return url, token, payload
 
-        result = call_server(url, token, payload)
+    def extract_embeddings(self, result: Any) -> Embeddings:
         return result['embeddings']
 
-class GeminiEmbeddingFunction(EmbeddingFunction[Documents]):
-    def __init__(self, model: str):
-        self.model = model
-
-    def __call__(self, input: Documents) -> Embeddings:
+class GeminiEmbeddingFunction(RemoteEmbeddingFunction):
+    # the API accepts at most 100 requests per batch, the payload size is not documented
+    max_batch_size = 100
+    max_payload_size = 1024 * 1024
+    def build_request(self, input: Documents) -> tuple[str, str|None, Any]:
         # see https://ai.google.dev/gemini-api/docs/embeddings#curl
         token = get_envvar("GEMINI_API_KEY")
         url = f"https://generativelanguage.googleapis.com/v1beta/{self.model}:batchEmbedContents?key={token}"
@@ -71,15 +134,16 @@ class GeminiEmbeddingFunction(EmbeddingFunction[Documents]):
                 }
             for d in input]
         }
+        return url, None, payload
 
-        result = call_server(url, None, payload)
+    def extract_embeddings(self, result: Any) -> Embeddings:
         return [r['values'] for r in result['embeddings']]
 
-class TogetherEmbeddingFunction(EmbeddingFunction[Documents]):
-    def __init__(self, model: str):
-        self.model = model
-
-    def __call__(self, input: Documents) -> Embeddings:
+class TogetherEmbeddingFunction(RemoteEmbeddingFunction):
+    # the batch and payload limits are not documented
+    max_batch_size = 128
+    max_payload_size = 1024 * 1024
+    def build_request(self, input: Documents) -> tuple[str, str|None, Any]:
         # see https://docs.together.ai/docs/embeddings-overview#generating-multiple-embeddings
         url = "https://api.together.xyz/v1/embeddings"
         token = get_envvar("TOGETHER_API_KEY")
@@ -87,39 +151,62 @@ class TogetherEmbeddingFunction(EmbeddingFunction[Documents]):
              "model": self.model,
              "input": input
             }
+        return url, token, payload
 
-        result = call_server(url, token, payload)
+    def extract_embeddings(self, result: Any) -> Embeddings:
         return [d['embedding'] for d in result['data']]
 
-class MistralEmbeddingFunction(EmbeddingFunction[Documents]):
-    def __init__(self, model: str):
-        self.model = model
-
-    def __call__(self, input: Documents) -> Embeddings:
+class MistralEmbeddingFunction(RemoteEmbeddingFunction):
+    # the API limits the number of tokens of a request (16384), this is approximated by a limit on the size of the texts
+    max_batch_size = 128
+    max_payload_size = 32 * 1024
+    def build_request(self, input: Documents) -> tuple[str, str|None, Any]:
         url = "https://api.mistral.ai/v1/embeddings"
         token = get_envvar("MISTRAL_API_KEY")
         payload = {
              "model": self.model,
              "input": input
             }
+        return url, token, payload
 
-        result = call_server(url, token, payload)
+    def extract_embeddings(self, result: Any) -> Embeddings:
         return [d['embedding'] for d in result['data']]
 
-class HuggingFaceEmbeddingFunction(EmbeddingFunction[Documents]):
-    def __init__(self, model: str):
-        self.model = model
-
-    def __call__(self, input: Documents) -> Embeddings:
+class HuggingFaceEmbeddingFunction(RemoteEmbeddingFunction):
+    # the batch and payload limits are not documented, the serverless inference API is slow with large batches
+    max_batch_size = 32
+    max_payload_size = 256 * 1024
+    def build_request(self, input: Documents) -> tuple[str, str|None, Any]:
         url = f"https://api-inference.huggingface.co/pipeline/feature-extraction/{self.model}"
         token = get_envvar("HUGGINGFACE_API_KEY")
         payload = {
              "inputs": input
             }
+        return url, token, payload
 
-        result = call_server(url, token, payload)
+    def extract_embeddings(self, result: Any) -> Embeddings:
         return result
 
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Wrap an embedding function so that the embeddings already computed are read from a persistent cache
+    instead of being recomputed (i.e. instead of being sent again to the embedding host).
+    """
+    def __init__(self, embedding_function: EmbeddingFunction, cache: EmbeddingCache, host: str|None, model: str):
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self.host = host
+        self.model = model
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = self.cache.get(self.host, self.model, list(input))
+        missing_texts = list(dict.fromkeys(text for text, embedding in zip(input, embeddings) if embedding is None))
+        if missing_texts:
+            computed_embeddings = { text: np.asarray(embedding, dtype=np.float32) for text, embedding in zip(missing_texts, self.embedding_function(missing_texts)) }
+            self.cache.put(self.host, self.model, missing_texts, list(computed_embeddings.values()))
+            embeddings = [computed_embeddings[text] if embedding is None else embedding for text, embedding in zip(input, embeddings)]
+        return embeddings
+
 def build_embedding_function(host: str|None, model: str) -> EmbeddingFunction:
     if (host == None) or (host == ''):
         return SentenceTransformerEmbeddingFunction(model_name=model)
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import common
+
+database_name = "embeddings.cache.sqlite3"
+default_max_size = 256 * 1024 * 1024
+
+class EmbeddingCache:
+    """
+    Persistent cache of the embeddings computed by the embedding models.
+    The embeddings are stored as float32 blobs in a SQLite database, keyed by (host, model, SHA-256 of the text).
+    When the total size of the stored embeddings exceeds the maximum size, the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_path: str, max_size: int = default_max_size):
+        """
+        Open the cache, creating it if needed.
+
+        Args:
+            db_path: The path to the database directory (the cache is stored next to the model database).
+            max_size: The maximum size (in bytes) of the stored embeddings.
+        """
+        os.makedirs(db_path, exist_ok=True)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"{db_path}/{database_name}", check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                host TEXT NOT NULL,
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (host, model, text_hash)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)')
+        self._conn.commit()
+
+    def close(self) -> None:
+        """
+        Close the cache.
+        """
+        with self._lock:
+            self._conn.close()
+
+    def get(self, host: str|None, model: str, texts: list[str]) -> list[np.ndarray|None]:
+        """
+        Get the cached embeddings of some texts.
+
+        Args:
+            host: The host of the model (may be None).
+            model: The name of the model.
+            texts: The texts.
+
+        Returns:
+            The embedding of each text, None for the texts which are not in the cache.
+        """
+        hashes = [common.get_content_hash(text) for text in texts]
+        vectors: dict[str, np.ndarray] = {}
+        with self._lock:
+            # SQLite limits the number of parameters of a query, so the lookup is done per slice
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(f'SELECT text_hash, vector FROM embeddings WHERE host = ? AND model = ? AND text_hash IN ({placeholders})',
+                                          (host or '', model, *chunk)).fetchall()
+                for text_hash, vector in rows:
+                    vectors[text_hash] = np.frombuffer(vector, dtype=np.float32)
+            if vectors:
+                self._conn.executemany('UPDATE embeddings SET last_used = ? WHERE host = ? AND model = ? AND text_hash = ?',
+                                       [(time.time(), host or '', model, text_hash) for text_hash in vectors])
+                self._conn.commit()
+        return [vectors.get(text_hash) for text_hash in hashes]
+
+    def put(self, host: str|None, model: str, texts: list[str], vectors: list) -> None:
+        """
+        Store the embeddings of some texts, then evict the least recently used embeddings if the cache is too large.
+
+        Args:
+            host: The host of the model (may be None).
+            model: The name of the model.
+            texts: The texts.
+            vectors: The embedding of each text.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO embeddings (host, model, text_hash, vector, last_used) VALUES (?, ?, ?, ?, ?)',
+                                   [(host or '', model, common.get_content_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now) for text, vector in zip(texts, vectors)])
+            self._evict()
+            self._conn.commit()
+
+    def size(self) -> int:
+        """
+        Return the total size (in bytes) of the stored embeddings.
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings').fetchone()[0]
+
+    def _evict(self) -> None:
+        size = self._conn.execute('SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings').fetchone()[0]
+        if size <= self.max_size:
+            return
+        evicted = []
+        for rowid, length in self._conn.execute('SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used ASC'):
+            if size <= self.max_size:
+                break
+            evicted.append((rowid,))
+            size -= length
+        self._conn.executemany('DELETE FROM embeddings WHERE rowid = ?', evicted)
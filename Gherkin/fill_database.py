@@ -1,27 +1,85 @@
 import argparse
 import json
+import os
 
 import common
+import keyword_reader
 import model_db
 import vector_db
+import vector_store
+
+checkpoint_file_name = "fill.checkpoint.json"  # file (in the database folder) recording the last chunk written by an interrupted fill
+
+def get_checkpoint_key(args: argparse.Namespace) -> dict:
+    """
+    Return what identifies a fill: a checkpoint can only be used to resume the same fill of the same keyword file.
+    """
+    stat = os.stat(args.keyword_file)
+    return {
+        'keyword_file': os.path.abspath(args.keyword_file),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'model': args.model,
+        'project': args.project,
+        'backend': args.backend,
+        'chunk_size': args.chunk_size
+    }
+
+def read_checkpoint(checkpoint_file: str, key: dict) -> int:
+    """
+    Return the index of the first chunk to write, i.e. the one following the last chunk written by an interrupted fill.
+    """
+    if not os.path.exists(checkpoint_file):
+        return 0
+    try:
+        with open(checkpoint_file, 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return 0
+    if checkpoint.get('key') != key:
+        return 0
+    return checkpoint['next_chunk']
+
+def write_checkpoint(checkpoint_file: str, key: dict, next_chunk: int) -> None:
+    with open(f"{checkpoint_file}.tmp", 'w', encoding='utf-8') as file:
+        json.dump({'key': key, 'next_chunk': next_chunk}, file)
+    os.replace(f"{checkpoint_file}.tmp", checkpoint_file)
 
 def main():
     parser = argparse.ArgumentParser(description="Compute embedding vectors and store them in the Chroma database.")
-    parser.add_argument("keyword_file", help="JSON file containing keywords")
+    parser.add_argument("keyword_file", help="JSON file containing keywords (or NDJSON file, with a .ndjson or .jsonl extension, containing a keyword per line)")
     parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model to use (default: all-MiniLM-L6-v2)")
     parser.add_argument("--db_path", default="./chromadb/database", help="Path to the Chroma database (default: ./chromadb/database)")
     parser.add_argument("--project", default="Common", help="Name of the project (default: Common)")
+    parser.add_argument("--backend", default="chroma", choices=vector_store.backends, help="Vector store holding the embeddings (default: chroma)")
+    parser.add_argument("--chunk_size", default=500, type=int, help="Number of keywords read and written at once (default: 500)")
+    parser.add_argument("--sync", action="store_true", help="Delete from the project the keywords and descriptions which are not in the keyword file")
+    parser.add_argument("--no_resume", action="store_true", help="Do not resume an interrupted fill of the same file, restart from the first keyword")
     args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error("--chunk_size must be a positive integer")
     model, host = common.parse_model_and_host(args.model)
 
     # Setup database
     model_db.setup_database(args.db_path)
 
-    # Load keywords
-    with open(args.keyword_file, 'r', encoding='utf-8') as file:
-        data = json.load(file)
+    # Resume an interrupted fill, if any
+    checkpoint_file = os.path.join(args.db_path, checkpoint_file_name)
+    key = get_checkpoint_key(args)
+    first_chunk = 0 if args.no_resume else read_checkpoint(checkpoint_file, key)
+    if first_chunk > 0:
+        print(f"Resuming after the {first_chunk * args.chunk_size} keywords written by the interrupted fill", flush=True)
+
+    def on_chunk(index: int, statistics: dict[str, int]) -> None:
+        write_checkpoint(checkpoint_file, key, index + 1)
+        print(f"{(first_chunk * args.chunk_size) + statistics['keywords']} keywords processed ({statistics['embedded']} texts embedded, {statistics['skipped']} texts skipped)", flush=True)
 
-    vector_db.fill_database(args.db_path, model, host, args.project, data)
+    # Read the keywords incrementally and write them by chunks
+    keywords = keyword_reader.read_keywords(args.keyword_file)
+    statistics = vector_db.fill_database_by_chunks(args.db_path, model, host, args.project, keywords, args.backend, args.chunk_size, first_chunk, on_chunk, args.sync)
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    print(f"{statistics['embedded']} texts embedded, {statistics['skipped']} texts skipped (unchanged), {statistics['deleted']} texts deleted")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,124 @@
+import email.utils
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+retried_status_codes = { 429, 500, 502, 503, 504 }
+
+class Transport:
+    """
+    HTTP transport used to call the embedding hosts.
+    It keeps a pool of kept-alive connections per host, applies a timeout to each request, and retries the requests
+    which fail with a 429 or 5xx status (or a connection error) with an exponential backoff, honoring the Retry-After header
+    (up to the maximum backoff).
+    """
+
+    def __init__(self, timeout: float = 60.0, max_retries: int = 5, backoff_factor: float = 1.0, max_backoff: float = 60.0, pool_size: int = 16):
+        """
+        Args:
+            timeout: The connect and read timeout (in seconds) of a request.
+            max_retries: The maximum number of retries of a request.
+            backoff_factor: The delay (in seconds) before the first retry, it is doubled for each following retry.
+            max_backoff: The maximum delay (in seconds) between two retries (a longer Retry-After delay is shortened to it).
+            pool_size: The maximum number of connections kept alive per host.
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def post(self, url: str, headers: dict[str, str], payload: Any) -> requests.Response:
+        """
+        Post a JSON payload, retrying if needed.
+
+        Args:
+            url: The URL.
+            headers: The HTTP headers.
+            payload: The payload, it is sent as JSON.
+
+        Returns:
+            The response (which may have an error status if all the retries have failed).
+
+        Raises:
+            requests.exceptions.RequestException: If the request cannot be sent (even after the retries).
+        """
+        session = self._get_session(url)
+        attempt = 0
+        while True:
+            try:
+                response = session.post(url, headers=headers, json=payload, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._get_backoff(attempt))
+            else:
+                if (response.status_code not in retried_status_codes) or (attempt >= self.max_retries):
+                    return response
+                delay = get_retry_after(response)
+                time.sleep(min(self.max_backoff, delay) if delay is not None else self._get_backoff(attempt))
+            attempt += 1
+
+    def close(self) -> None:
+        """
+        Close all the kept-alive connections.
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def forget_sessions(self) -> None:
+        """
+        Forget the kept-alive connections without closing them (to be called in a forked process, since they are still used by its parent).
+        """
+        with self._lock:
+            self._sessions.clear()
+
+    def _get_session(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def _get_backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+
+def get_retry_after(response: requests.Response) -> float|None:
+    """
+    Return the delay (in seconds) requested by the Retry-After header of a response.
+
+    Args:
+        response: The response.
+
+    Returns:
+        The delay, None if the header is absent or invalid.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+default_transport = Transport()
@@ -1,12 +1,18 @@
+import hashlib
 import json
+import os
 import re
 import uuid
 import argparse
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 from gherkin.parser import Parser
 from gherkin.token_scanner import TokenScanner
 
+# namespace of the keyword ids, which are derived from the type and the condensed keyword, so they are stable across runs
+keyword_id_namespace = uuid.UUID('6f2b8e0c-3f4d-4a57-9d1e-2c5b7a8e9f10')
+
 def condense_keyword(keyword: str, string_delimiter: str = '"') -> str:
     """
     Condense a keyword by removing any specific integer, float, strings, or parameter name.
@@ -20,29 +26,51 @@ def condense_keyword(keyword: str, string_delimiter: str = '"') -> str:
     condensed_keyword = re.sub(r'\d+', '123', condensed_keyword)
     return condensed_keyword
 
+def get_keyword_id(keyword_type: str, condensed_keyword: str) -> str:
+    """
+    Return the id of a keyword, it only depends on the type and the condensed keyword.
+    """
+    return str(uuid.uuid5(keyword_id_namespace, f"{keyword_type}\n{condensed_keyword}"))
+
 def extract_keywords_from_feature_file(file_path: str, string_delimiter: str = '"') -> list[dict[str, str]]:
     """
     Extract Gherkin keywords from a single feature file.
     Return a list of dictionaries containing keyword type, text, and description.
+
+    Raises:
+        ValueError: If the file cannot be read or is not a valid feature file.
+    """
+    return extract_keywords_from_content(read_feature_file(file_path), file_path, string_delimiter)
+
+def read_feature_file(file_path: str) -> str:
+    """
+    Return the content of a feature file.
+
+    Raises:
+        ValueError: If the file cannot be read.
     """
-    # Read the feature file
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            return f.read()
     except Exception as e:
-        print(f"Error reading file {file_path}: {str(e)}")
-        return []
+        raise ValueError(f"Error reading file {file_path}: {str(e)}")
 
+def extract_keywords_from_content(content: str, file_path: str, string_delimiter: str = '"') -> list[dict[str, str]]:
+    """
+    Extract Gherkin keywords from the content of a feature file.
+    Return a list of dictionaries containing keyword type, text, and description.
+
+    Raises:
+        ValueError: If the content is not a valid feature file.
+    """
     # Parse the feature file
     parser = Parser()
     try:
         feature = parser.parse(TokenScanner(content))
     except Exception as e:
-        print(f"Error parsing file {file_path}: {str(e)}", file=sys.stderr)
-        sys.exit(1)
+        raise ValueError(f"Error parsing file {file_path}: {str(e)}")
     if 'feature' not in feature:
-        print(f"Error parsing file {file_path}: Feature not found", file=sys.stderr)
-        sys.exit(1)
+        raise ValueError(f"Error parsing file {file_path}: Feature not found")
 
     # Process each feature (it can either be a scenario or a background, but we do not care, we can retrieve the steps the same way)
     keywords = []
@@ -55,8 +83,7 @@ def extract_keywords_from_feature_file(file_path: str, string_delimiter: str = '
             step_type = step['keywordType']
             if (step_type == 'Conjunction'):
                 if (lastKeywordType == None):
-                    print("Conjunction without previous keyword", file=sys.stderr)
-                    sys.exit(1)
+                    raise ValueError(f"Error parsing file {file_path}: Conjunction without previous keyword")
                 else:
                     step_type = lastKeywordType
             else:
@@ -68,7 +95,7 @@ def extract_keywords_from_feature_file(file_path: str, string_delimiter: str = '
                 'keyword': keyword,
                 'condensed_keyword': condensed_keyword,
                 'description': '',
-                'id': str(uuid.uuid4())
+                'id': get_keyword_id(step_type, condensed_keyword)
             })
 
     return keywords
@@ -89,6 +116,54 @@ def sort_keywords(keywords: list[dict[str, str]]) -> list[dict[str, str]]:
         )
     )
 
+class KeywordConsolidator:
+    """
+    Consolidate keywords, the files being merged one by one.
+    The keywords are indexed by type and condensed keyword, so that a keyword is deduplicated in constant time.
+    If a keyword with the same type and condensed keyword already exists, the longest keyword is kept.
+    """
+
+    def __init__(self, keywords: list[dict[str, str]]|None = None):
+        """
+        Args:
+            keywords: The already consolidated keywords (None for none).
+        """
+        # the insertion order of the dictionary is the order in which the keywords have been (last) recorded
+        self._keywords: dict[tuple[str, str], dict[str, str]] = {}
+        if keywords is not None:
+            self.add_all(keywords)
+
+    def add(self, keyword: dict[str, str]) -> None:
+        """
+        Add a keyword.
+        """
+        key = (keyword['type'], keyword['condensed_keyword'])
+        existing_keyword = self._keywords.get(key)
+        if existing_keyword is not None:
+            print(f"Duplicate keyword: old='{existing_keyword['keyword']}' new='{keyword['keyword']}'")
+            if len(existing_keyword['keyword']) > len(keyword['keyword']):
+                # we keep the already recorded keyword which is longer
+                return
+            # the new keyword is longer, we remove the old one
+            del self._keywords[key]
+        self._keywords[key] = keyword
+
+    def add_all(self, keywords: list[dict[str, str]]) -> None:
+        """
+        Add some keywords (e.g. the ones of a file).
+        """
+        for keyword in keywords:
+            self.add(keyword)
+
+    def get_keywords(self) -> list[dict[str, str]]:
+        """
+        Return the consolidated keywords.
+        """
+        return list(self._keywords.values())
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
 def consolidate_keywords(new_keywords: list[dict[str, str]], all_keywords: list[dict[str, str]]) -> None:
     """
     Add the new keywords into the existing list of all keywords.
@@ -107,40 +182,218 @@ def consolidate_keywords(new_keywords: list[dict[str, str]], all_keywords: list[
                 all_keywords.remove(existing_keyword)
         all_keywords.append(kw)
 
-def process_feature_files(file_paths: list[str], string_delimiter: str = '"') -> dict:
+class ExtractionCache:
     """
-    Process multiple feature files and return a dictionary with unique, sorted keywords.
+    Persistent cache of the keywords extracted from each feature file, stored as a JSON file.
+    The entry of a file is reused if its modification time and size are unchanged, or if its content hash is unchanged,
+    so only the modified files are parsed again.
     """
-    all_keywords = []
-    
-    for file_path in file_paths:
-        if file_path.endswith('.feature'):
-            keywords = extract_keywords_from_feature_file(file_path, string_delimiter)
-            consolidate_keywords(keywords, all_keywords)
-    
+
+    def __init__(self, cache_file: str, string_delimiter: str = '"'):
+        """
+        Args:
+            cache_file: The path of the cache file (it is created if it does not exist).
+            string_delimiter: The string delimiter used to condense the keywords, the entries extracted with another one are ignored.
+        """
+        self.cache_file = cache_file
+        self.string_delimiter = string_delimiter
+        self._entries: dict[str, dict] = {}
+        self._used: set[str] = set()
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('string_delimiter') == string_delimiter:
+                    self._entries = data['files']
+            except (OSError, ValueError, KeyError):
+                print(f"Ignoring invalid cache file {cache_file}", file=sys.stderr)
+
+    def get(self, file_path: str) -> list[dict[str, str]]|None:
+        """
+        Return the cached keywords of a file if the file has not been modified, None otherwise.
+        """
+        entry = self._entries.get(os.path.abspath(file_path))
+        if entry is None:
+            return None
+        stat = os.stat(file_path)
+        if (entry['mtime_ns'] != stat.st_mtime_ns) or (entry['size'] != stat.st_size):
+            return None
+        self._used.add(os.path.abspath(file_path))
+        return entry['keywords']
+
+    def get_content_hash(self, file_path: str) -> str|None:
+        """
+        Return the content hash of the cached version of a file, None if the file is not cached.
+        """
+        entry = self._entries.get(os.path.abspath(file_path))
+        return entry['hash'] if entry is not None else None
+
+    def reuse(self, file_path: str) -> list[dict[str, str]]:
+        """
+        Return the cached keywords of a file whose content is unchanged (only its modification time has changed).
+        """
+        entry = self._entries[os.path.abspath(file_path)]
+        stat = os.stat(file_path)
+        entry['mtime_ns'] = stat.st_mtime_ns
+        entry['size'] = stat.st_size
+        self._used.add(os.path.abspath(file_path))
+        return entry['keywords']
+
+    def put(self, file_path: str, content_hash: str, keywords: list[dict[str, str]]) -> None:
+        """
+        Record the keywords of a file.
+        """
+        stat = os.stat(file_path)
+        self._entries[os.path.abspath(file_path)] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': content_hash,
+            'keywords': keywords
+        }
+        self._used.add(os.path.abspath(file_path))
+
+    def save(self) -> None:
+        """
+        Write the cache file, the entries of the files which have not been processed by this run are dropped.
+        """
+        files = { path: entry for path, entry in self._entries.items() if path in self._used }
+        with open(f"{self.cache_file}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'string_delimiter': self.string_delimiter, 'files': files}, f)
+        os.replace(f"{self.cache_file}.tmp", self.cache_file)
+
+def extract_keywords_or_error(file_path: str, string_delimiter: str = '"', known_hash: str|None = None) -> tuple[list[dict[str, str]]|None, str|None, str|None]:
+    """
+    Extract Gherkin keywords from a single feature file (this is the task run by the worker processes).
+
+    Args:
+        file_path: The path of the feature file.
+        string_delimiter: The string delimiter to use (either " or ').
+        known_hash: The content hash of the cached version of the file, the file is not parsed if its content has this hash.
+
+    Returns:
+        The keywords (None if the content hash is known, an empty list if the file cannot be parsed),
+        the content hash (None if the file cannot be read), and the error message (None if there is no error).
+    """
+    try:
+        content = read_feature_file(file_path)
+    except ValueError as e:
+        return [], None, str(e)
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    if content_hash == known_hash:
+        return None, content_hash, None
+    try:
+        return extract_keywords_from_content(content, file_path, string_delimiter), content_hash, None
+    except ValueError as e:
+        return [], content_hash, str(e)
+
+def find_feature_files(paths: list[str]) -> list[str]:
+    """
+    Return the feature files among some paths, the directories being walked recursively.
+    """
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, directory_names, file_names in os.walk(path):
+                directory_names.sort()
+                file_paths.extend(os.path.join(directory, file_name) for file_name in sorted(file_names) if file_name.endswith('.feature'))
+        elif path.endswith('.feature'):
+            file_paths.append(path)
+    return file_paths
+
+def process_feature_files(file_paths: list[str], string_delimiter: str = '"', jobs: int = 1, errors: list[str]|None = None, cache_file: str|None = None) -> dict:
+    """
+    Process multiple feature files (or directories containing feature files) and return a dictionary with unique, sorted keywords.
+
+    Args:
+        file_paths: The paths of the feature files and of the directories.
+        string_delimiter: The string delimiter to use (either " or ').
+        jobs: The number of processes parsing the files.
+        errors: The list to which the errors of the files which cannot be parsed are appended (these files are then ignored),
+                None to stop at the first error.
+        cache_file: The path of the cache of the keywords extracted from each file, None to parse all the files.
+
+    Raises:
+        ValueError: If a file cannot be parsed and errors is None.
+    """
+    consolidator = KeywordConsolidator()
+    feature_files = find_feature_files(file_paths)
+    cache = ExtractionCache(cache_file, string_delimiter) if cache_file is not None else None
+
+    # Get the keywords of the unmodified files from the cache (these lists belong to the cache, they are not copied)
+    cached_keywords: list[list[dict[str, str]]|None] = [cache.get(file_path) if cache is not None else None for file_path in feature_files]
+    modified_files = [i for i, keywords in enumerate(cached_keywords) if keywords is None]
+    known_hashes = [cache.get_content_hash(feature_files[i]) if cache is not None else None for i in modified_files]
+
+    def get_keywords(i: int, keywords: list[dict[str, str]]|None, content_hash: str|None, error: str|None) -> list[dict[str, str]]:
+        file_path = feature_files[i]
+        if error is not None:
+            if errors is None:
+                raise ValueError(error)
+            errors.append(error)
+            return []
+        if keywords is None:
+            assert cache is not None
+            return cache.reuse(file_path)
+        assert content_hash is not None
+        if cache is not None:
+            cache.put(file_path, content_hash, keywords)
+        return keywords
+
+    def merge(file_results) -> None:
+        # The keywords are merged in the order of the files, as soon as they are available, so the output does not depend on the number
+        # of processes nor on the cache, and only the consolidated keywords are kept in memory
+        file_results = iter(file_results)
+        for i, keywords in enumerate(cached_keywords):
+            if keywords is None:
+                keywords = get_keywords(i, *next(file_results))
+            consolidator.add_all(keywords)
+
+    if jobs > 1 and len(modified_files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(modified_files) // (jobs * 4))
+            merge(executor.map(extract_keywords_or_error, [feature_files[i] for i in modified_files], [string_delimiter] * len(modified_files), known_hashes, chunksize=chunksize))
+    else:
+        merge(extract_keywords_or_error(feature_files[i], string_delimiter, known_hash) for i, known_hash in zip(modified_files, known_hashes))
+    if cache is not None:
+        cache.save()
+
     # Sort the keywords
-    sorted_keywords = sort_keywords(all_keywords)
+    sorted_keywords = sort_keywords(consolidator.get_keywords())
 
-    # Remove the `condensed_keyword` field
-    for kw in sorted_keywords:
-        del kw['condensed_keyword']
+    # Remove the `condensed_keyword` field (the keywords are copied since the cached ones keep it)
+    sorted_keywords = [{key: value for key, value in kw.items() if key != 'condensed_keyword'} for kw in sorted_keywords]
 
     return {'keywords': sorted_keywords}
 
 def main():
 
     parser = argparse.ArgumentParser(description='Extract keywords from Gherkin feature files and save them to a JSON file.')
-    parser.add_argument('feature_files', nargs='+', help='One or more .feature files to process')
+    parser.add_argument('feature_files', nargs='+', help='One or more .feature files, or directories containing .feature files (they are walked recursively), to process')
     parser.add_argument('output_file', help='Output JSON file to store the extracted keywords')
     parser.add_argument('--string_delimiter', choices=['"', "'"], default='"', help='String delimiter to use when condensing keywords (default: ")')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of processes parsing the feature files (default: 1)')
+    parser.add_argument('--cache_file', help='File caching the keywords extracted from each feature file, so only the modified files are parsed again (default: the output file with a .cache.json extension)')
+    parser.add_argument('--no_cache', action='store_true', help='Parse all the feature files without using the cache')
     args = parser.parse_args()
 
     # Process the files and get the keywords
-    result = process_feature_files(args.feature_files, args.string_delimiter)
+    errors: list[str] = []
+    if args.no_cache:
+        cache_file = None
+    else:
+        cache_file = args.cache_file or f"{os.path.splitext(args.output_file)[0]}.cache.json"
+    result = process_feature_files(args.feature_files, args.string_delimiter, args.jobs, errors, cache_file)
     
     # Write the result to a JSON file
     with open(args.output_file, 'w', encoding='utf-8') as f:
         json.dump(result, f, indent=2)
 
+    # Report the files which could not be parsed
+    if errors:
+        print(f"{len(errors)} file(s) could not be parsed and have been ignored:", file=sys.stderr)
+        for error in errors:
+            print(error, file=sys.stderr)
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
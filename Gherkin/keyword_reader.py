@@ -0,0 +1,151 @@
+import json
+from typing import Iterator, TextIO
+
+# Incremental readers of the keyword files, so that the keywords of a large library are processed one at a time
+# instead of loading the whole file in memory. Two formats are supported:
+# - JSON: an object whose 'keywords' member is the list of the keywords (see the schema in the README),
+# - NDJSON: one keyword (JSON object) per line.
+
+ndjson_extensions = ('.ndjson', '.jsonl')
+block_size = 65536
+
+def read_keywords(file_path: str) -> Iterator[dict]:
+    """
+    Read the keywords of a keyword file one by one.
+    The file is an NDJSON file if its extension is `.ndjson` or `.jsonl`, a JSON file otherwise.
+
+    Args:
+        file_path: The path of the keyword file.
+
+    Yields:
+        The keywords.
+
+    Raises:
+        ValueError: If the file is not a valid keyword file.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        if file_path.lower().endswith(ndjson_extensions):
+            yield from read_ndjson_keywords(file)
+        else:
+            yield from read_json_keywords(file)
+
+def read_ndjson_keywords(file: TextIO) -> Iterator[dict]:
+    """
+    Read the keywords of an NDJSON file (one keyword per line, the empty lines are ignored).
+
+    Raises:
+        ValueError: If a line is not a JSON object.
+    """
+    for line_number, line in enumerate(file, start=1):
+        if line.strip() == '':
+            continue
+        try:
+            keyword = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON at line {line_number}: {e}")
+        if not isinstance(keyword, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object")
+        yield keyword
+
+def read_json_keywords(file: TextIO) -> Iterator[dict]:
+    """
+    Read the keywords of a JSON file incrementally (only one keyword is decoded at a time).
+
+    Raises:
+        ValueError: If the file is not a JSON object containing a 'keywords' list.
+    """
+    reader = _IncrementalReader(file)
+    reader.expect('{')
+    found = False
+    if reader.peek() == '}':
+        reader.expect('}')
+    else:
+        while True:
+            key = reader.decode()
+            if not isinstance(key, str):
+                raise ValueError("Invalid JSON: object key expected")
+            reader.expect(':')
+            if key == 'keywords':
+                found = True
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.expect(']')
+                else:
+                    while True:
+                        keyword = reader.decode()
+                        if not isinstance(keyword, dict):
+                            raise ValueError("Invalid keyword file: each keyword must be a JSON object")
+                        yield keyword
+                        if reader.expect(',', ']') == ']':
+                            break
+            else:
+                reader.decode()
+            if reader.expect(',', '}') == '}':
+                break
+    if not found:
+        raise ValueError("Invalid keyword file: 'keywords' not found")
+
+class _IncrementalReader:
+    """
+    Decode the JSON values of a file one by one, reading the file by blocks.
+    """
+
+    def __init__(self, file: TextIO):
+        self.file = file
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def peek(self) -> str:
+        """
+        Return the next non-whitespace character ('' at the end of the file).
+        """
+        while True:
+            while (self.position < len(self.buffer)) and self.buffer[self.position].isspace():
+                self.position += 1
+            if (self.position < len(self.buffer)) or not self._read():
+                return self.buffer[self.position:self.position + 1]
+
+    def expect(self, *characters: str) -> str:
+        """
+        Consume the next non-whitespace character, which must be one of the given ones, and return it.
+        """
+        character = self.peek()
+        if character == '' or character not in characters:
+            raise ValueError(f"Invalid JSON: {' or '.join(repr(c) for c in characters)} expected, {repr(character) if character else 'end of file'} found")
+        self.position += 1
+        return character
+
+    def decode(self) -> object:
+        """
+        Decode the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as e:
+                # the value may be truncated by the end of the buffer
+                if self._read():
+                    continue
+                raise ValueError(f"Invalid JSON: {e}")
+            # a number may also be truncated by the end of the buffer
+            if (end == len(self.buffer)) and self._read():
+                continue
+            self.position = end
+            return value
+
+    def _read(self) -> bool:
+        """
+        Read the next block of the file (the consumed part of the buffer is dropped), return False at the end of the file.
+        """
+        if self.eof:
+            return False
+        block = self.file.read(block_size)
+        if block == '':
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + block
+        self.position = 0
+        return True
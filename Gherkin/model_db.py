@@ -1,8 +1,54 @@
+import hashlib
 import sqlite3
 import os
+import threading
+import time
 
 database_name = "models.db.sqlite3"
 
+# A single connection is opened per database and shared by the threads (the accesses are serialized by the lock).
+# The models are rarely added, so they are also kept in memory (per database): the lookups do not access the database,
+# unless the model is unknown (it may have been added by another process).
+_lock = threading.RLock()
+_connections: dict[str, sqlite3.Connection] = {}
+_models: dict[str, dict[int, dict]] = {}
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """
+    Return the connection to the database, it is opened (in WAL mode) on first use.
+    The connection can be used by any thread, but only while holding the lock of this module.
+
+    Args:
+        db_path: The path to the database directory.
+    """
+    with _lock:
+        if db_path not in _connections:
+            conn = sqlite3.connect(f"{db_path}/{database_name}", check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            _connections[db_path] = conn
+        return _connections[db_path]
+
+def close_connection(db_path: str) -> None:
+    """
+    Close the connection to the database and forget the models kept in memory.
+
+    Args:
+        db_path: The path to the database directory.
+    """
+    with _lock:
+        conn = _connections.pop(db_path, None)
+        if conn is not None:
+            conn.close()
+        _models.pop(db_path, None)
+
+def forget_connections() -> None:
+    """
+    Forget the connections without closing them (to be called in a forked process, since they are still used by its parent).
+    """
+    with _lock:
+        _connections.clear()
+        _models.clear()
+
 def setup_database(db_path: str) -> None:
     """
     Set up the database by creating the necessary directories and files.
@@ -13,31 +59,45 @@ def setup_database(db_path: str) -> None:
     # Create the directories
     os.makedirs(db_path, exist_ok=True)
 
-    # Create SQLite connection
-    conn = sqlite3.connect(f"{db_path}/{database_name}")
-    cursor = conn.cursor()
-    
-    # Create a table for non-vector data
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS models (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            model TEXT NOT NULL,
-            host TEXT
-        )
-    ''')
-
-    # Ensure that the model and host are unique
-    cursor.execute('''
-        CREATE UNIQUE INDEX IF NOT EXISTS unique_model_host ON models (model, host)
-        WHERE host IS NOT NULL
-    ''')
-    cursor.execute('''
-        CREATE UNIQUE INDEX IF NOT EXISTS unique_model_null_host ON models (model)
-        WHERE host IS NULL;
-    ''')
-    
-    conn.commit()
-    conn.close()
+    with _lock:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        # Create a table for non-vector data
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS models (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model TEXT NOT NULL,
+                host TEXT
+            )
+        ''')
+
+        # Ensure that the model and host are unique
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS unique_model_host ON models (model, host)
+            WHERE host IS NOT NULL
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS unique_model_null_host ON models (model)
+            WHERE host IS NULL;
+        ''')
+
+        # Create the catalog of the collections (one row per collection of each vector store)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS collections (
+                backend TEXT NOT NULL,
+                model_id INTEGER NOT NULL REFERENCES models (id),
+                project TEXT NOT NULL,
+                keyword_type TEXT NOT NULL,
+                dimension INTEGER,
+                document_count INTEGER NOT NULL,
+                last_fill_time REAL NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (backend, model_id, project, keyword_type)
+            )
+        ''')
+
+        conn.commit()
 
 def delete_database(db_path: str) -> None:
     """
@@ -46,7 +106,11 @@ def delete_database(db_path: str) -> None:
     Args:
         db_path: The path to the database directory.
     """
+    close_connection(db_path)
     os.remove(f"{db_path}/{database_name}")
+    for suffix in ["-wal", "-shm"]:
+        if os.path.exists(f"{db_path}/{database_name}{suffix}"):
+            os.remove(f"{db_path}/{database_name}{suffix}")
 
 def add_model_and_host(db_path: str, model: str, host: str|None) -> int:
     """
@@ -63,28 +127,28 @@ def add_model_and_host(db_path: str, model: str, host: str|None) -> int:
     Raises:
         Exception: If the model already exists.
     """
-    # Store regular data in SQLite
-    conn = sqlite3.connect(f"{db_path}/{database_name}")
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('''
-            INSERT INTO models (model, host) 
-            VALUES (?, ?)
-        ''', (model, host))
-        
-        # Get the ID of the inserted model
-        id = cursor.lastrowid
-        conn.commit()
-        assert id is not None
-        
-        return id
-        
-    except sqlite3.IntegrityError:
-        print(f"Model {model} at {host} already exists")
-        raise Exception(f"Model {model} at {host} already exists")
-    finally:
-        conn.close()
+    with _lock:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('''
+                INSERT INTO models (model, host)
+                VALUES (?, ?)
+            ''', (model, host))
+
+            # Get the ID of the inserted model
+            id = cursor.lastrowid
+            conn.commit()
+            assert id is not None
+
+            _get_models(db_path)[id] = { 'id': id, 'model': model, 'host': host }
+            return id
+
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            print(f"Model {model} at {host} already exists")
+            raise Exception(f"Model {model} at {host} already exists")
 
 def get_model_and_host(db_path: str, model_id: int) -> dict[str, str]:
     """
@@ -100,20 +164,12 @@ def get_model_and_host(db_path: str, model_id: int) -> dict[str, str]:
     Raises:
         Exception: If the model is not found.
     """
-    # Get data from SQLite
-    conn = sqlite3.connect(f"{db_path}/{database_name}")
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM models WHERE id = ?', (model_id,))
-    model_data = cursor.fetchone()
-    conn.close()
-    
-    if model_data:
-        return {
-            'id': model_data[0],
-            'model': model_data[1],
-            'host': model_data[2]
-        }
+    with _lock:
+        models = _get_models(db_path)
+        if model_id not in models:
+            models = _get_models(db_path, refresh=True)
+        if model_id in models:
+            return dict(models[model_id])
     raise Exception(f"Model {model_id} not found")
 
 def get_model_id(db_path: str, model: str, host: str|None) -> int|None:
@@ -126,19 +182,105 @@ def get_model_id(db_path: str, model: str, host: str|None) -> int|None:
         host: The host of the model (may be None).
 
     Returns:
-        The ID of the model.
+        The ID of the model, None if the model is not found.
+    """
+    with _lock:
+        for refresh in [False, True]:
+            for model_data in _get_models(db_path, refresh).values():
+                if (model_data['model'] == model) and (model_data['host'] == host):
+                    return model_data['id']
+    return None
 
-    Raises:
-        Exception: If the model is not found.
+def update_collection(db_path: str, backend: str, model_id: int, project: str, keyword_type: str, dimension: int|None, document_count: int, fingerprint: str) -> None:
     """
-    # Get data from SQLite
-    conn = sqlite3.connect(f"{db_path}/{database_name}")
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id FROM models WHERE model = ? AND (host = ? OR (host IS NULL AND ? IS NULL))', (model, host, host))
-    model_id = cursor.fetchone()
-    conn.close()
+    Record the current state of a collection in the catalog.
 
-    if model_id:
-        return model_id[0]
-    return None
+    Args:
+        db_path: The path to the database directory.
+        backend: The kind of vector store ('chroma' or 'numpy').
+        model_id: The ID of the model.
+        project: The name of the project.
+        keyword_type: The type of keyword.
+        dimension: The dimension of the embeddings (None if the collection is empty).
+        document_count: The number of documents (keywords and descriptions) of the collection.
+        fingerprint: The fingerprint of the content of the collection.
+    """
+    with _lock:
+        conn = get_connection(db_path)
+        conn.execute('''
+            INSERT INTO collections (backend, model_id, project, keyword_type, dimension, document_count, last_fill_time, fingerprint)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (backend, model_id, project, keyword_type) DO UPDATE SET
+                dimension = excluded.dimension,
+                document_count = excluded.document_count,
+                last_fill_time = excluded.last_fill_time,
+                fingerprint = excluded.fingerprint
+        ''', (backend, model_id, project, keyword_type, dimension, document_count, time.time(), fingerprint))
+        conn.commit()
+
+def get_collections(db_path: str, backend: str, model_id: int|None = None, project: str|None = None, keyword_type: str|None = None) -> list[dict]:
+    """
+    Get the catalog of the collections of a vector store.
+
+    Args:
+        db_path: The path to the database directory.
+        backend: The kind of vector store ('chroma' or 'numpy').
+        model_id: The ID of the model of the collections, None for all the models.
+        project: The name of the project of the collections, None for all the projects.
+        keyword_type: The type of keyword of the collections, None for all the types.
+
+    Returns:
+        The collections, sorted by model ID, project, and keyword type, as dictionaries with 'model_id', 'model', 'host',
+        'project', 'keyword_type', 'dimension', 'document_count', 'last_fill_time', and 'fingerprint' keys.
+    """
+    conditions = ['c.backend = ?']
+    parameters: list = [backend]
+    for column, value in [('model_id', model_id), ('project', project), ('keyword_type', keyword_type)]:
+        if value is not None:
+            conditions.append(f'c.{column} = ?')
+            parameters.append(value)
+    with _lock:
+        cursor = get_connection(db_path).cursor()
+        cursor.execute(f'''
+            SELECT c.model_id, m.model, m.host, c.project, c.keyword_type, c.dimension, c.document_count, c.last_fill_time, c.fingerprint
+            FROM collections c JOIN models m ON m.id = c.model_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY c.model_id, c.project, c.keyword_type
+        ''', parameters)
+        columns = ['model_id', 'model', 'host', 'project', 'keyword_type', 'dimension', 'document_count', 'last_fill_time', 'fingerprint']
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def get_collection(db_path: str, backend: str, model_id: int, project: str, keyword_type: str) -> dict|None:
+    """
+    Get the catalog entry of a collection.
+
+    Returns:
+        The collection as described in get_collections, None if it is not in the catalog.
+    """
+    collections = get_collections(db_path, backend, model_id, project, keyword_type)
+    return collections[0] if collections else None
+
+def get_catalog_version(db_path: str, backend: str) -> str:
+    """
+    Return a version of the catalog of a vector store, which changes whenever a collection is filled.
+    """
+    with _lock:
+        cursor = get_connection(db_path).cursor()
+        cursor.execute('''
+            SELECT model_id, project, keyword_type, fingerprint FROM collections
+            WHERE backend = ?
+            ORDER BY model_id, project, keyword_type
+        ''', (backend,))
+        rows = cursor.fetchall()
+    return hashlib.sha1(repr(rows).encode('utf-8')).hexdigest()
+
+def _get_models(db_path: str, refresh: bool = False) -> dict[int, dict]:
+    """
+    Return the models of the database, indexed by ID (they are read from the database on first use, or if refresh is True).
+    """
+    with _lock:
+        if refresh or (db_path not in _models):
+            cursor = get_connection(db_path).cursor()
+            cursor.execute('SELECT id, model, host FROM models')
+            _models[db_path] = { row[0]: { 'id': row[0], 'model': row[1], 'host': row[2] } for row in cursor.fetchall() }
+        return _models[db_path]
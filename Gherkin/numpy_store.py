@@ -0,0 +1,268 @@
+import json
+import os
+import threading
+from typing import Any, Callable
+
+import numpy as np
+
+# A vector store keeping, for each collection, the embeddings in a contiguous float32 matrix stored in a `.npy` file
+# (which is memory-mapped when read) and the ids, documents, and metadatas in a `.json` file.
+# The search is exact: the embeddings are normalized, so the cosine similarities of a query are computed by a single
+# matrix-vector product and the nearest neighbours are selected with argpartition.
+# The collections implement the subset of the Chroma Collection API used by this project, the returned distances are
+# cosine distances.
+
+directory_name = "numpy"
+
+class NumpyCollection:
+
+    def __init__(self, path: str, name: str, embedding_function: Callable[[list[str]], Any]|None = None):
+        """
+        Args:
+            path: The directory containing the files of the collections.
+            name: The name of the collection.
+            embedding_function: The function computing the embeddings of the documents and of the query texts.
+        """
+        self.name = name
+        self.embedding_function = embedding_function
+        self._matrix_file = os.path.join(path, f"{name}.npy")
+        self._data_file = os.path.join(path, f"{name}.json")
+        self._lock = threading.Lock()
+        self._loaded_version: tuple[int, int]|None = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._ids: list[str] = []
+        self._documents: list[str] = []
+        self._metadatas: list[dict|None] = []
+        self._positions: dict[str, int] = {}
+
+    def count(self) -> int:
+        """
+        Return the number of documents of the collection.
+        """
+        with self._lock:
+            self._load()
+            return len(self._ids)
+
+    def get(self, ids: list[str]|None = None, limit: int|None = None, offset: int|None = None, include: list|None = None) -> dict[str, Any]:
+        """
+        Return some documents of the collection.
+
+        Args:
+            ids: The ids of the documents to return (the unknown ones are ignored), None for all the documents.
+            limit: The maximum number of documents to return.
+            offset: The number of documents to skip.
+            include: What to return ('documents', 'metadatas', and/or 'embeddings'), None for the documents and metadatas.
+
+        Returns:
+            A dictionary containing the 'ids' and, according to include, the 'documents', 'metadatas', and 'embeddings' of the documents.
+        """
+        if include is None:
+            include = ["metadatas", "documents"]
+        with self._lock:
+            self._load()
+            if ids is None:
+                positions = list(range(len(self._ids)))
+            else:
+                positions = [self._positions[id] for id in ids if id in self._positions]
+            positions = positions[(offset or 0):]
+            if limit is not None:
+                positions = positions[:limit]
+            return self._build_result(positions, include)
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict]|None = None, embeddings: Any = None) -> None:
+        """
+        Insert or update some documents.
+
+        Args:
+            ids: The ids of the documents.
+            documents: The texts of the documents.
+            metadatas: The metadatas of the documents.
+            embeddings: The embeddings of the documents, computed with the embedding function if they are not provided.
+        """
+        if embeddings is None:
+            assert self.embedding_function is not None
+            embeddings = self.embedding_function(documents)
+        vectors = normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self._load()
+            matrix = np.array(self._matrix) if len(self._ids) > 0 else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            if matrix.shape[1] != vectors.shape[1]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimensionality {matrix.shape[1]}")
+            new_rows = []
+            for i, id in enumerate(ids):
+                metadata = metadatas[i] if metadatas is not None else None
+                if id in self._positions:
+                    position = self._positions[id]
+                    matrix[position] = vectors[i]
+                    self._documents[position] = documents[i]
+                    self._metadatas[position] = metadata
+                else:
+                    self._positions[id] = len(self._ids)
+                    self._ids.append(id)
+                    self._documents.append(documents[i])
+                    self._metadatas.append(metadata)
+                    new_rows.append(vectors[i])
+            if new_rows:
+                matrix = np.vstack([matrix, np.array(new_rows, dtype=np.float32)])
+            self._save(matrix)
+
+    def delete(self, ids: list[str]) -> None:
+        """
+        Delete some documents (the unknown ones are ignored).
+
+        Args:
+            ids: The ids of the documents.
+        """
+        with self._lock:
+            self._load()
+            deleted = { self._positions[id] for id in ids if id in self._positions }
+            if not deleted:
+                return
+            kept = [position for position in range(len(self._ids)) if position not in deleted]
+            matrix = np.array(self._matrix[kept]) if kept else np.zeros((0, self._matrix.shape[1]), dtype=np.float32)
+            self._ids = [self._ids[position] for position in kept]
+            self._documents = [self._documents[position] for position in kept]
+            self._metadatas = [self._metadatas[position] for position in kept]
+            self._positions = { id: position for position, id in enumerate(self._ids) }
+            self._save(matrix)
+
+    def query(self, query_embeddings: Any = None, query_texts: list[str]|None = None, n_results: int = 10, include: list|None = None) -> dict[str, Any]:
+        """
+        Return the nearest neighbours of some queries.
+
+        Args:
+            query_embeddings: The embeddings of the queries.
+            query_texts: The texts of the queries (used if query_embeddings is not provided).
+            n_results: The number of neighbours to return per query.
+            include: What to return ('documents', 'metadatas', 'embeddings', and/or 'distances'), None for the documents, metadatas, and distances.
+
+        Returns:
+            A dictionary containing, for each query, the 'ids' and, according to include, the 'documents', 'metadatas', 'embeddings',
+            and 'distances' (cosine distances) of its neighbours, sorted from the nearest.
+        """
+        if include is None:
+            include = ["metadatas", "documents", "distances"]
+        if query_embeddings is None:
+            assert (self.embedding_function is not None) and (query_texts is not None)
+            query_embeddings = self.embedding_function(query_texts)
+        queries = normalize(np.asarray(query_embeddings, dtype=np.float32))
+        with self._lock:
+            self._load()
+            results: dict[str, Any] = { 'ids': [], 'documents': [], 'metadatas': [], 'embeddings': [], 'distances': [] }
+            k = min(n_results, len(self._ids))
+            similarities = self._matrix @ queries.T if k > 0 else np.zeros((0, len(queries)), dtype=np.float32)
+            for column in similarities.T:
+                best = np.argpartition(-column, k - 1)[:k] if k > 0 else np.array([], dtype=int)
+                best = best[np.argsort(-column[best], kind='stable')]
+                result = self._build_result(best.tolist(), include)
+                for key in ['ids', 'documents', 'metadatas', 'embeddings']:
+                    results[key].append(result[key])
+                results['distances'].append((1.0 - column[best]).tolist())
+            for key in ['documents', 'metadatas', 'embeddings', 'distances']:
+                if key not in include:
+                    results[key] = None
+            return results
+
+    def _build_result(self, positions: list[int], include: list) -> dict[str, Any]:
+        return {
+            'ids': [self._ids[position] for position in positions],
+            'documents': [self._documents[position] for position in positions] if 'documents' in include else None,
+            'metadatas': [self._metadatas[position] for position in positions] if 'metadatas' in include else None,
+            'embeddings': self._matrix[positions] if 'embeddings' in include else None
+        }
+
+    def _load(self) -> None:
+        """
+        (Re)load the files of the collection if they have been modified (possibly by another process).
+        """
+        if not os.path.exists(self._data_file):
+            return
+        version = get_version(self._data_file)
+        if version == self._loaded_version:
+            return
+        with open(self._data_file, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        self._ids = data['ids']
+        self._documents = data['documents']
+        self._metadatas = data['metadatas']
+        self._positions = { id: position for position, id in enumerate(self._ids) }
+        self._matrix = np.load(self._matrix_file, mmap_mode='r') if len(self._ids) > 0 else np.zeros((0, 0), dtype=np.float32)
+        self._loaded_version = version
+
+    def _save(self, matrix: np.ndarray) -> None:
+        """
+        Write the files of the collection (the data file is written last, since its modification time identifies the version).
+        """
+        np.save(f"{self._matrix_file}.tmp.npy", np.ascontiguousarray(matrix, dtype=np.float32))
+        with open(f"{self._data_file}.tmp", 'w', encoding='utf-8') as file:
+            json.dump({ 'ids': self._ids, 'documents': self._documents, 'metadatas': self._metadatas }, file)
+        self._matrix = matrix
+        os.replace(f"{self._matrix_file}.tmp.npy", self._matrix_file)
+        os.replace(f"{self._data_file}.tmp", self._data_file)
+        self._loaded_version = get_version(self._data_file)
+
+class NumpyClient:
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: The path to the database directory (the collections are stored in its `numpy` subdirectory).
+        """
+        self._path = os.path.join(path, directory_name)
+        self._collections: dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self._path, exist_ok=True)
+
+    def list_collections(self) -> list[str]:
+        """
+        Return the names of the collections.
+        """
+        return sorted(file_name[:-len(".json")] for file_name in os.listdir(self._path) if file_name.endswith(".json"))
+
+    def get_collection(self, name: str, embedding_function: Callable[[list[str]], Any]|None = None) -> NumpyCollection:
+        """
+        Return an existing collection.
+
+        Raises:
+            ValueError: If the collection does not exist.
+        """
+        if not os.path.exists(os.path.join(self._path, f"{name}.json")):
+            raise ValueError(f"Collection {name} does not exist.")
+        return self.get_or_create_collection(name, embedding_function)
+
+    def get_or_create_collection(self, name: str, embedding_function: Callable[[list[str]], Any]|None = None) -> NumpyCollection:
+        """
+        Return a collection, it is created when documents are added to it.
+        """
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NumpyCollection(self._path, name, embedding_function)
+            collection = self._collections[name]
+            if embedding_function is not None:
+                collection.embedding_function = embedding_function
+            return collection
+
+    def delete_collection(self, name: str) -> None:
+        """
+        Delete a collection.
+        """
+        with self._lock:
+            self._collections.pop(name, None)
+            for file_name in [f"{name}.json", f"{name}.npy"]:
+                if os.path.exists(os.path.join(self._path, file_name)):
+                    os.remove(os.path.join(self._path, file_name))
+
+def get_version(file_path: str) -> tuple[int, int]:
+    """
+    Return the version of a file, i.e. its modification time and its size.
+    """
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Return the vectors (the rows of a matrix) scaled to a unit norm.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Hashable
+
+class QueryCoalescer:
+    """
+    Run the searches of the web server in an executor, making sure that rapid typing creates a bounded load:
+    - the results of the recent searches are kept in an LRU cache,
+    - identical searches which are in flight at the same time are run only once,
+    - when a client sends a new search (identified by a sequence number), its previous search is cancelled if it has
+      not started yet and no other client is waiting for it, and the older searches of this client are rejected
+      (the latest search is only remembered for the most recently active clients).
+    """
+
+    def __init__(self, executor_getter: Callable[[], Executor], max_size: int = 256, max_clients: int = 1024):
+        """
+        Args:
+            executor_getter: The function returning the executor running the searches.
+            max_size: The maximum number of results kept in the cache, 0 to disable the cache.
+            max_clients: The maximum number of clients whose latest search is remembered.
+        """
+        self.executor_getter = executor_getter
+        self.max_size = max_size
+        self.max_clients = max_clients
+        self._results: OrderedDict[Hashable, Any] = OrderedDict()
+        self._in_flight: dict[Hashable, _InFlight] = {}
+        self._latest: OrderedDict[str, tuple[int, Hashable]] = OrderedDict()
+        # reentrant, since the callback of a future is called immediately if the future is already done
+        self._lock = threading.RLock()
+
+    def submit(self, key: Hashable, function: Callable[..., Any], *args: Any, client: str|None = None, seq: int|None = None) -> Future|None:
+        """
+        Submit a search.
+
+        Args:
+            key: The key identifying the search (two searches with the same key return the same results).
+            function: The function running the search.
+            *args: The arguments of the function.
+            client: The identifier of the client sending the search, None if the search cannot be superseded.
+            seq: The sequence number of the search for this client (it increases with each search of the client).
+
+        Returns:
+            The future of the results (it is cancelled if the search is superseded before it starts),
+            None if a more recent search of the client has already been submitted.
+        """
+        with self._lock:
+            if (client is not None) and (seq is not None):
+                if client in self._latest:
+                    latest_seq, latest_key = self._latest[client]
+                    if seq < latest_seq:
+                        return None
+                    if latest_key != key:
+                        self._release(latest_key, client)
+                self._latest[client] = (seq, key)
+                self._latest.move_to_end(client)
+                while len(self._latest) > self.max_clients:
+                    self._latest.popitem(last=False)
+
+            if key in self._results:
+                self._results.move_to_end(key)
+                future: Future = Future()
+                future.set_result(self._results[key])
+                return future
+
+            if key in self._in_flight:
+                self._in_flight[key].add_waiter(client)
+                return self._in_flight[key].future
+
+            future = self.executor_getter().submit(function, *args)
+            self._in_flight[key] = _InFlight(future, client)
+            future.add_done_callback(lambda done: self._on_done(key, done))
+            return future
+
+    def is_superseded(self, client: str|None, seq: int|None) -> bool:
+        """
+        Return True if a more recent search of the client has been submitted.
+        """
+        if (client is None) or (seq is None):
+            return False
+        with self._lock:
+            return (client in self._latest) and (self._latest[client][0] > seq)
+
+    def clear(self) -> None:
+        """
+        Forget the cached results.
+        """
+        with self._lock:
+            self._results.clear()
+
+    def _release(self, key: Hashable, client: str) -> None:
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            return
+        in_flight.waiters.discard(client)
+        if not in_flight.pinned and not in_flight.waiters:
+            # a cancelled future is removed from the in-flight searches by its callback
+            in_flight.future.cancel()
+
+    def _on_done(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            if (in_flight is not None) and (in_flight.future is future):
+                del self._in_flight[key]
+            if future.cancelled() or (future.exception() is not None) or (self.max_size == 0):
+                return
+            self._results[key] = future.result()
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+class _InFlight:
+    """
+    A search being run, and the clients waiting for it.
+    """
+
+    def __init__(self, future: Future, client: str|None):
+        self.future = future
+        self.waiters: set[str] = set()
+        self.pinned = False  # True if a request which cannot be superseded is waiting for the search
+        self.add_waiter(client)
+
+    def add_waiter(self, client: str|None) -> None:
+        if client is None:
+            self.pinned = True
+        else:
+            self.waiters.add(client)
@@ -1,27 +1,48 @@
 import argparse
+import csv
 
 import common
 import vector_db
+import vector_store
+
+def print_results(project: str, keyword_type: str, keyword: str, results: list[dict[str, str]]) -> None:
+    print(f"Top {len(results)} matches for '{keyword}' in {project} project in {keyword_type} category:")
+    print("ID\tMatch\tKeyword\tKeyword distance\tDescription\tDescription distance")
+    for result in results:
+        print(f"{result['id']}\t{result['match']}\t{result['keyword']}\t{(result['keyword_distance']) if 'keyword_distance' in result else '-'}\t{result['description'] if 'description' in result else '-'}\t{(result['description_distance']) if 'description_distance' in result else '-'}")
 
 def main():
     parser = argparse.ArgumentParser(description="Query Chroma database for keyword matches.")
     parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model to use (default: all-MiniLM-L6-v2)")
     parser.add_argument("--db_path", default="./chromadb/database", help="Path to the Chroma database (default: ./chromadb/database)")
     parser.add_argument("--project", default="Common", help="Name of the project (default: Common)")
+    parser.add_argument("--backend", default="chroma", choices=vector_store.backends, help="Vector store holding the embeddings (default: chroma)")
     parser.add_argument("--nb_results", default=3, type=int, help="Number of matches to return (default: 3)")
-    parser.add_argument("--keyword_type", required=True, choices=["Context", "Action", "Outcome"], help="Type of keyword")
-    parser.add_argument("keyword", help="Keyword to query")
-    
+    parser.add_argument("--keyword_type", choices=["Context", "Action", "Outcome"], help="Type of keyword")
+    parser.add_argument("--queries_file", help="TSV file containing a keyword type and a keyword per line (the first line contains the headers, it is ignored), all its keywords are queried at once")
+    parser.add_argument("keyword", nargs='?', help="Keyword to query")
+
     args = parser.parse_args()
+    if args.queries_file is None and (args.keyword is None or args.keyword_type is None):
+        parser.error("either --keyword_type and keyword, or --queries_file must be provided")
+    if args.queries_file is not None and args.keyword is not None:
+        parser.error("keyword cannot be used with --queries_file")
 
     model, host = common.parse_model_and_host(args.model)
-    results = vector_db.search_keywords(args.db_path, host, model, args.project, args.keyword_type, args.keyword, args.nb_results)
+
+    if args.queries_file is None:
+        queries = [(args.keyword_type, args.keyword)]
+    else:
+        with open(args.queries_file, 'r', encoding='utf-8') as file:
+            next(file)  # Skip header row
+            reader = csv.reader(file, delimiter='\t')
+            queries = [(row[0], row[1]) for row in reader if len(row) >= 2]
+
+    all_results = vector_db.search_keywords_batch(args.db_path, host, model, args.project, queries, args.nb_results, args.backend)
 
     # Print results
-    print(f"Top {len(results)} matches for '{args.keyword}' in {args.project} project in {args.keyword_type} category:")
-    print("ID\tMatch\tKeyword\tKeyword distance\tDescription\tDescription distance")
-    for result in results:
-        print(f"{result['id']}\t{result['match']}\t{result['keyword']}\t{(result['keyword_distance']) if 'keyword_distance' in result else '-'}\t{result['description'] if 'description' in result else '-'}\t{(result['description_distance']) if 'description_distance' in result else '-'}")
+    for (keyword_type, keyword), results in zip(queries, all_results):
+        print_results(args.project, keyword_type, keyword, results)
 
 if __name__ == "__main__":
     main()
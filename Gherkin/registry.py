@@ -0,0 +1,274 @@
+import threading
+from collections import OrderedDict
+
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions.sentence_transformer_embedding_function import SentenceTransformerEmbeddingFunction
+
+import common
+import common_embed
+import embedding_cache
+import model_db
+import vector_store
+
+# The registry keeps, for the whole process, the vector store clients, the embedding functions, and the collections
+# which have already been opened, so that successive searches do not pay for reloading them.
+# The entries are keyed by (db_path, model, host) and are evicted in LRU order when the memory used by the
+# embedding functions exceeds the memory budget (None means no limit).
+# The queries sent to remote models are embedded through a persistent cache, stored in each database directory.
+
+class _Entry:
+    def __init__(self, model_id: int):
+        self.model_id = model_id
+        self.collections: dict[tuple[str, str, str], vector_store.VectorCollection] = {}
+
+_lock = threading.RLock()
+_clients: dict[tuple[str, str], vector_store.VectorStore] = {}
+_embedding_functions: dict[tuple[str, str|None], tuple[EmbeddingFunction, int]] = {}
+_loading_locks: dict[tuple[str, str|None], threading.Lock] = {}  # held while a model is loaded, outside of the main lock
+_entries: OrderedDict[tuple[str, str, str|None], _Entry] = OrderedDict()
+_memory_budget: int|None = None
+_embedding_caches: dict[str, embedding_cache.EmbeddingCache] = {}
+_embedding_cache_size: int = embedding_cache.default_max_size
+_query_embedding_functions: dict[tuple[str, str, str|None], EmbeddingFunction] = {}
+
+def set_memory_budget(memory_budget: int|None) -> None:
+    """
+    Set the maximum memory (in bytes) that the embedding functions kept in the registry may use.
+    Least recently used entries are evicted immediately if the new budget is exceeded.
+
+    Args:
+        memory_budget: The memory budget in bytes, None for no limit.
+    """
+    global _memory_budget
+    with _lock:
+        _memory_budget = memory_budget
+        _evict(None)
+
+def set_embedding_cache_size(embedding_cache_size: int) -> None:
+    """
+    Set the maximum size (in bytes) of the persistent embedding caches.
+
+    Args:
+        embedding_cache_size: The maximum size in bytes, 0 to disable the caches.
+    """
+    global _embedding_cache_size
+    with _lock:
+        _embedding_cache_size = embedding_cache_size
+        for cache in _embedding_caches.values():
+            cache.max_size = embedding_cache_size
+        _query_embedding_functions.clear()
+
+def get_client(db_path: str, backend: str = "chroma") -> vector_store.VectorStore:
+    """
+    Return the vector store client of a database, creating it if needed.
+
+    Args:
+        db_path: The path to the database.
+        backend: The kind of vector store ('chroma' or 'numpy').
+
+    Returns:
+        The client.
+    """
+    with _lock:
+        if (db_path, backend) not in _clients:
+            _clients[(db_path, backend)] = vector_store.open_store(db_path, backend)
+        return _clients[(db_path, backend)]
+
+def get_model_id(db_path: str, model: str, host: str|None) -> int|None:
+    """
+    Return the id of a model, as recorded in the SQLite database, and register the model.
+
+    Args:
+        db_path: The path to the database directory.
+        model: The name of the model.
+        host: The host of the model (may be None).
+
+    Returns:
+        The id of the model, None if the model is unknown.
+    """
+    entry = _get_entry(db_path, model, host)
+    return entry.model_id if entry else None
+
+def get_embedding_function(db_path: str, model: str, host: str|None) -> EmbeddingFunction:
+    """
+    Return the embedding function of a model, loading it if needed.
+
+    Args:
+        db_path: The path to the database directory.
+        model: The name of the model.
+        host: The host of the model (may be None).
+
+    Returns:
+        The embedding function.
+    """
+    key = (model, host)
+    with _lock:
+        if key in _embedding_functions:
+            return _embedding_functions[key][0]
+        loading_lock = _loading_locks.setdefault(key, threading.Lock())
+    # Loading a model may take seconds, so it is done without holding the main lock (the other models remain usable),
+    # the loading lock ensuring that a model is loaded only once
+    with loading_lock:
+        with _lock:
+            if key in _embedding_functions:
+                return _embedding_functions[key][0]
+        embedding_function = common_embed.build_embedding_function(host, model)
+        memory = _estimate_memory(embedding_function)
+        with _lock:
+            _embedding_functions[key] = (embedding_function, memory)
+            _loading_locks.pop(key, None)
+            _evict((db_path, model, host))
+            return embedding_function
+
+def preload(db_path: str, model_names: list[str]) -> None:
+    """
+    Load some embedding models and compute a first embedding with each local one,
+    so that the first searches (or fills) do not pay for the loading time.
+
+    Args:
+        db_path: The path to the database directory.
+        model_names: The names of the models (as "model" or "model@host" strings).
+    """
+    for model_name in model_names:
+        model, host = common.parse_model_and_host(model_name)
+        print(f"Loading model {model_name}", flush=True)
+        embedding_function = get_embedding_function(db_path, model, host)
+        if host is None:
+            embedding_function(["warm-up"])
+
+def get_query_embedding_function(db_path: str, model: str, host: str|None) -> EmbeddingFunction:
+    """
+    Return the embedding function to use for the queries of a model.
+    For a remote model, the embeddings are read from (and written to) the persistent cache of the database,
+    so that a query which has already been embedded is not sent again to the host.
+
+    Args:
+        db_path: The path to the database directory.
+        model: The name of the model.
+        host: The host of the model (may be None).
+
+    Returns:
+        The embedding function.
+    """
+    embedding_function = get_embedding_function(db_path, model, host)
+    with _lock:
+        if (host is None) or (_embedding_cache_size == 0):
+            return embedding_function
+        key = (db_path, model, host)
+        if key not in _query_embedding_functions:
+            if db_path not in _embedding_caches:
+                _embedding_caches[db_path] = embedding_cache.EmbeddingCache(db_path, _embedding_cache_size)
+            _query_embedding_functions[key] = common_embed.CachedEmbeddingFunction(embedding_function, _embedding_caches[db_path], host, model)
+        return _query_embedding_functions[key]
+
+def get_collection(db_path: str, model: str, host: str|None, project: str, keyword_type: str, backend: str = "chroma") -> vector_store.VectorCollection:
+    """
+    Return the collection of a model, project, and keyword type.
+
+    Args:
+        db_path: The path to the database.
+        model: The name of the model.
+        host: The host of the model (may be None).
+        project: The name of the project.
+        keyword_type: The type of keyword.
+        backend: The kind of vector store ('chroma' or 'numpy').
+
+    Returns:
+        The collection.
+
+    Raises:
+        ValueError: If the model and/or project do not exist in the database.
+    """
+    key = (backend, project, keyword_type)
+    with _lock:
+        entry = _get_entry(db_path, model, host)
+        if not entry:
+            raise ValueError(f"Model {model} at host {host} do not exist in SQLite database {db_path}.")
+        if key in entry.collections:
+            return entry.collections[key]
+    # the model is loaded (if needed) without holding the main lock
+    embedding_function = get_embedding_function(db_path, model, host)
+    with _lock:
+        if key not in entry.collections:
+            try:
+                collection = get_client(db_path, backend).get_collection(
+                    name=common.get_collection_name(entry.model_id, project, keyword_type),
+                    embedding_function=embedding_function
+                )
+            except ValueError as e:
+                raise ValueError(f"Error: Model {model} and/or project {project} do not exist in {backend} database {db_path}.") from e
+            entry.collections[key] = collection
+        return entry.collections[key]
+
+def forget_connections() -> None:
+    """
+    Forget the vector store clients, the collections, and the embedding caches, while keeping the loaded embedding functions.
+    This must be called in a forked process, so that it does not share the database connections of its parent.
+    The connections are dropped without being closed, since they are still used by the parent.
+    """
+    with _lock:
+        _clients.clear()
+        for entry in _entries.values():
+            entry.collections.clear()
+        _embedding_caches.clear()
+        _query_embedding_functions.clear()
+
+def _get_entry(db_path: str, model: str, host: str|None) -> _Entry|None:
+    with _lock:
+        key = (db_path, model, host)
+        if key in _entries:
+            _entries.move_to_end(key)
+            return _entries[key]
+        model_id = model_db.get_model_id(db_path, model, host)
+        if model_id is None:
+            return None
+        _entries[key] = _Entry(model_id)
+        return _entries[key]
+
+def _evict(kept_key: tuple[str, str, str|None]|None) -> None:
+    """
+    Evict the least recently used entries until the embedding functions fit in the memory budget.
+    The entry whose key is kept_key is never evicted.
+    """
+    if _memory_budget is None:
+        return
+    kept_model_and_host = (kept_key[1], kept_key[2]) if kept_key else None
+    def is_used(model_and_host: tuple[str, str|None]) -> bool:
+        return (model_and_host == kept_model_and_host) or any((k[1], k[2]) == model_and_host for k in _entries.keys())
+    # first, release the embedding functions which are not used by any entry
+    for model_and_host in list(_embedding_functions.keys()):
+        if _used_memory() <= _memory_budget:
+            return
+        if not is_used(model_and_host):
+            _release_embedding_function(model_and_host)
+    # then, evict the entries, from the least recently used
+    for key in list(_entries.keys()):
+        if _used_memory() <= _memory_budget:
+            return
+        if key == kept_key:
+            continue
+        del _entries[key]
+        if not is_used((key[1], key[2])):
+            _release_embedding_function((key[1], key[2]))
+
+def _used_memory() -> int:
+    return sum(size for (_, size) in _embedding_functions.values())
+
+def _release_embedding_function(model_and_host: tuple[str, str|None]) -> None:
+    embedding_function, _ = _embedding_functions.pop(model_and_host, (None, 0))
+    for key in [k for k in _query_embedding_functions.keys() if (k[1], k[2]) == model_and_host]:
+        del _query_embedding_functions[key]
+    if isinstance(embedding_function, SentenceTransformerEmbeddingFunction):
+        # Chroma keeps its own class-level cache of the loaded SentenceTransformer models
+        SentenceTransformerEmbeddingFunction.models.pop(model_and_host[0], None)
+
+def _estimate_memory(embedding_function: EmbeddingFunction) -> int:
+    """
+    Estimate the memory used by an embedding function: the size of the weights for a local model, 0 for a remote one.
+    """
+    if isinstance(embedding_function, SentenceTransformerEmbeddingFunction):
+        # _model is private to Chroma, the memory is unknown (i.e. 0) if it is not available
+        model = getattr(embedding_function, '_model', None)
+        if hasattr(model, 'parameters'):
+            return sum(p.numel() * p.element_size() for p in model.parameters())
+    return 0
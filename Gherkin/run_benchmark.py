@@ -1,36 +1,118 @@
 import argparse
+import contextlib
 import csv
 import html
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
+import benchmark_metrics
 import common
+import registry
 import vector_db
+import vector_store
 
-def process_file(file_path, hosts, models, db_path, project, nb_results):
+def process_file(file_path, hosts, models, db_path, project, nb_results, jobs=1, jobs_per_host=None, batch_size=None, backend="chroma", timings=None):
     results = {}
-    index = 1
-    
+
     with open(file_path, 'r', encoding='utf-8') as file:
         next(file)  # Skip header row
         reader = csv.reader(file, delimiter='\t')
-        for row in reader:
-            
-            keyword_type, keyword, expected_id = row
-            search_results = {}
-            
-            for host, model in zip(hosts, models):
-                model_results = vector_db.search_keywords(db_path, host, model, project, keyword_type, keyword, nb_results)
-                search_results[model] = { 'matches': model_results, 'success': [result['id'] for result in model_results].index(expected_id) if expected_id in [result['id'] for result in model_results] else -1 }
-            
-            results[index] = {
-                'keyword': keyword,
-                'results': search_results
-            }
-            index += 1
+        rows = [row for row in reader]
+
+    for index, (_, keyword, _) in enumerate(rows, start=1):
+        results[index] = {
+            'keyword': keyword,
+            'results': {}
+        }
+
+    # The rows are searched in batches (by default, a single batch containing all the rows) for each model
+    # The latency of each query is only known when the batches contain a single row
+    # The searches are run by a pool of threads, and the number of simultaneous searches per host can be limited
+    queries = [(keyword_type, keyword) for (keyword_type, keyword, _) in rows]
+    size = batch_size or max(len(queries), 1)
+    batch_starts = range(0, len(queries), size)
+    host_semaphores = { host: threading.Semaphore(jobs_per_host) for host in hosts } if jobs_per_host else {}
+
+    # The timings of the search calls of each model are recorded if requested
+    if timings is not None:
+        for model in models:
+            timings.setdefault(model, [])
+
+    def search(host, model, start):
+        semaphore = host_semaphores.get(host, contextlib.nullcontext())
+        with semaphore:
+            call_timings = { 'queries': len(queries[start:start + size]) }
+            call_timings['start'] = time.perf_counter()
+            model_results = vector_db.search_keywords_batch(db_path, host, model, project, queries[start:start + size], nb_results, backend, call_timings)
+            call_timings['end'] = time.perf_counter()
+            call_timings['total'] = call_timings['end'] - call_timings['start']
+            if timings is not None:
+                timings[model].append(call_timings)
+            return model_results
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # The searches of the different models are interleaved, so that the searches of a given host do not occupy all the threads
+        futures = { (model, start): executor.submit(search, host, model, start) for start in batch_starts for host, model in zip(hosts, models) }
+        for model in models:
+            for start in batch_starts:
+                for offset, ((_, _, expected_id), model_results) in enumerate(zip(rows[start:], futures[(model, start)].result())):
+                    results[start + offset + 1]['results'][model] = { 'matches': model_results, 'success': [result['id'] for result in model_results].index(expected_id) if expected_id in [result['id'] for result in model_results] else -1 }
+
     return results
 
 
 
-def generate_html(file_path, results):
+def format_metric(value, format):
+    return '-' if value is None else format.format(value)
+
+def generate_metrics_html(metrics):
+    # The values of k are those for which the recall has been computed
+    k_values = sorted({ int(key[len('recall@'):]) for model_metrics in metrics.values() for key in model_metrics if key.startswith('recall@') })
+    html_content = """
+        <table>
+            <tr>
+                <th>Model</th>
+                <th>Queries</th>
+    """
+    for k in k_values:
+        html_content += f"<th>Recall@{k}</th><th>MRR@{k}</th>"
+    html_content += """
+                <th>Queries per second</th>
+                <th>Latency p50 (ms)</th>
+                <th>Latency p95 (ms)</th>
+                <th>Latency p99 (ms)</th>
+                <th>Embedding (ms per query)</th>
+                <th>Query (ms per query)</th>
+                <th>Partner lookup (ms per query)</th>
+            </tr>
+    """
+    for model, model_metrics in metrics.items():
+        html_content += f"""
+            <tr>
+                <td>{html.escape(model)}</td>
+                <td>{model_metrics['queries']}</td>
+        """
+        for k in k_values:
+            html_content += f"<td>{format_metric(model_metrics[f'recall@{k}'], '{:.1%}')}</td><td>{format_metric(model_metrics[f'mrr@{k}'], '{:.3f}')}</td>"
+        html_content += f"""
+                <td>{format_metric(model_metrics['qps'], '{:.1f}')}</td>
+                <td>{format_metric(model_metrics['latency_p50'], '{:.1f}')}</td>
+                <td>{format_metric(model_metrics['latency_p95'], '{:.1f}')}</td>
+                <td>{format_metric(model_metrics['latency_p99'], '{:.1f}')}</td>
+                <td>{format_metric(model_metrics['embed_time'], '{:.2f}')}</td>
+                <td>{format_metric(model_metrics['query_time'], '{:.2f}')}</td>
+                <td>{format_metric(model_metrics['partner_time'], '{:.2f}')}</td>
+            </tr>
+        """
+    html_content += """
+        </table>
+        <br>
+    """
+    return html_content
+
+def generate_html(file_path, results, metrics=None, k_values=None):
     # Get unique list of models
     all_models = set()
     for data in results.values():
@@ -52,6 +134,13 @@ def generate_html(file_path, results):
         </style>
     </head>
     <body>
+    """
+
+    # Add the metrics of the models
+    if metrics is not None:
+        html_content += generate_metrics_html(metrics)
+
+    html_content += """
         <table>
             <tr>
                 <th rowspan="2">ID</th>
@@ -59,14 +148,19 @@ def generate_html(file_path, results):
     """
     
     # Add model names as column headers
+    # (when several values of k are studied, the rank of the expected match and its success for each k are displayed side by side)
+    columns_per_model = 2 + len(k_values) if k_values else 2
     for model in all_models:
-        html_content += f'<th colspan="2" class="model-header">{html.escape(model)}</th>'
+        html_content += f'<th colspan="{columns_per_model}" class="model-header">{html.escape(model)}</th>'
     
     html_content += "</tr><tr>"
     
     # Add subcolumn headers for each model
     for _ in all_models:
-        html_content += "<th>Matches</th><th>Success</th>"
+        if k_values:
+            html_content += "<th>Matches</th><th>Rank</th>" + "".join(f"<th>Top {k}</th>" for k in k_values)
+        else:
+            html_content += "<th>Matches</th><th>Success</th>"
     
     html_content += "</tr>"
 
@@ -88,10 +182,15 @@ def generate_html(file_path, results):
                                              description = {html.escape(match['description'] if 'description' in match else '')} 
                                              {match['description_distance'] if 'description_distance' in match else ''}
                                              """ for i, match in enumerate(model_results['matches'])])
-                success = "✔️" if (model_results['success'] >= 0) else '❌️'
-                html_content += f'<td class="matches">{matches}</td><td>{success}</td>'
+                if k_values:
+                    rank = model_results['success'] + 1 if model_results['success'] >= 0 else '-'
+                    successes = "".join(f"<td>{'✔️' if 0 <= model_results['success'] < k else '❌️'}</td>" for k in k_values)
+                    html_content += f'<td class="matches">{matches}</td><td>{rank}</td>{successes}'
+                else:
+                    success = "✔️" if (model_results['success'] >= 0) else '❌️'
+                    html_content += f'<td class="matches">{matches}</td><td>{success}</td>'
             else:
-                html_content += '<td>N/A</td><td>N/A</td>'
+                html_content += '<td>N/A</td>' * columns_per_model
         
         html_content += "</tr>"
 
@@ -109,20 +208,58 @@ def main():
     parser.add_argument("--models", required=True, help="Comma-separated list of the names of the models to evaluate")
     parser.add_argument("--db_path", default="./chromadb/database", help="Path to the Chroma database (default: ./chromadb/database)")
     parser.add_argument("--project", default="Common", help="Name of the project (default: Common)")
+    parser.add_argument("--backend", default="chroma", choices=vector_store.backends, help="Vector store holding the embeddings (default: chroma)")
     parser.add_argument("--nb_results", default=3, type=int, help="Number of matches to consider (default: 3)")
+    parser.add_argument("--k_values", help="Comma-separated list of numbers of matches to study at once (e.g. 1,3,5,12), the searches are run once with the largest one (it replaces --nb_results)")
+    parser.add_argument("--jobs", default=1, type=int, help="Number of searches run simultaneously (default: 1)")
+    parser.add_argument("--jobs_per_host", type=int, help="Maximum number of searches run simultaneously for a given host (default: no limit)")
+    parser.add_argument("--batch_size", type=int, help="Number of rows searched at once, use 1 to measure the p50/p95/p99 latency of each query (default: all the rows, the latencies are then not reported)")
+    parser.add_argument("--embedding_cache_size", type=int, default=256, help="Maximum size (in MB) of the cache of the query embeddings computed by remote models, 0 to disable it (default: 256)")
+    parser.add_argument("--metrics_file", help="Path to a JSON file (or CSV file, with a .csv extension) where the metrics of the models are written")
     parser.add_argument("benchmark_file", help="Path to the benchmark definition file")
     parser.add_argument("report_file", help="Path to the HTML report file to generate")
 
     args = parser.parse_args()
+    k_values = None
+    if args.k_values:
+        try:
+            k_values = sorted({ int(k) for k in args.k_values.split(',') })
+        except ValueError:
+            parser.error("--k_values must be a comma-separated list of integers")
+        if k_values[0] < 1:
+            parser.error("--k_values must only contain positive integers")
+    if args.jobs < 1:
+        parser.error("--jobs must be a positive integer")
+    if (args.jobs_per_host is not None) and (args.jobs_per_host < 1):
+        parser.error("--jobs_per_host must be a positive integer")
+    if (args.batch_size is not None) and (args.batch_size < 1):
+        parser.error("--batch_size must be a positive integer")
+    # The searches return the largest number of matches, the smaller values of k are computed from these ranked matches
+    nb_results = k_values[-1] if k_values else args.nb_results
     
     models = [common.parse_model_and_host(model)[0] for model in args.models.split(',')]
     hosts = [common.parse_model_and_host(model)[1] for model in args.models.split(',')]
+    registry.set_embedding_cache_size(args.embedding_cache_size * 1024 * 1024)
     
     # Run benchmark
-    results = process_file(args.benchmark_file, hosts, models, args.db_path, args.project, args.nb_results)
+    timings = {}
+    results = process_file(args.benchmark_file, hosts, models, args.db_path, args.project, nb_results, args.jobs, args.jobs_per_host, args.batch_size, args.backend, timings)
+    metrics = benchmark_metrics.compute_metrics(results, timings, k_values or [nb_results])
     
     # Generate HTML report
-    generate_html(args.report_file, results)
+    generate_html(args.report_file, results, metrics, k_values)
+
+    # Write the metrics, so that the runs can be compared over time
+    if args.metrics_file:
+        info = {
+            'benchmark': args.benchmark_file,
+            'project': args.project,
+            'backend': args.backend,
+            'nb_results': nb_results,
+            'batch_size': args.batch_size,
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds')
+        }
+        benchmark_metrics.write_metrics(args.metrics_file, metrics, info)
 
 if __name__ == "__main__":
     main()
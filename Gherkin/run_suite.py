@@ -0,0 +1,178 @@
+import argparse
+import csv
+import html
+import os
+import re
+from datetime import datetime, timezone
+
+import benchmark_metrics
+import common
+import keyword_reader
+import model_db
+import registry
+import run_benchmark
+import vector_db
+import vector_store
+
+def read_pairs(file_path: str) -> list[tuple[str, str]]:
+    """
+    Read the file pairing the keyword libraries with their benchmarks.
+    It is a TSV file whose first line contains the headers (it is ignored), each other line contains the name of a
+    library and the name of a benchmark.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        next(file)  # Skip header row
+        reader = csv.reader(file, delimiter='\t')
+        return [(row[0].strip(), row[1].strip()) for row in reader if len(row) >= 2]
+
+def get_project_name(library: str) -> str:
+    """
+    Return the project in which a library is stored (each library has its own project, so the benchmarks are isolated).
+    """
+    return f"suite_{re.sub('[^a-zA-Z0-9_]', '_', library)}"
+
+def generate_suite_html(file_path: str, runs: list[dict], models: list[str], k_values: list[int]) -> None:
+    """
+    Generate the aggregated report: the recall@k and MRR of each model for each (library, benchmark) pair.
+    """
+    html_content = """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <title>Benchmark suite results</title>
+        <style>
+            table { border-collapse: collapse; width: 100%; }
+            th, td { border: 1px solid black; padding: 8px; text-align: left; }
+            th { background-color: #f2f2f2; }
+            .model-header { text-align: center; }
+            .error { color: red; }
+        </style>
+    </head>
+    <body>
+        <table>
+            <tr>
+                <th rowspan="2">Library</th>
+                <th rowspan="2">Benchmark</th>
+    """
+    for model in models:
+        html_content += f'<th colspan="{len(k_values) + 1}" class="model-header">{html.escape(model)}</th>'
+    html_content += "</tr><tr>"
+    for _ in models:
+        html_content += "".join(f"<th>Recall@{k}</th>" for k in k_values) + f"<th>MRR@{k_values[-1]}</th>"
+    html_content += "</tr>"
+
+    pairs = list(dict.fromkeys((run['library'], run['benchmark']) for run in runs))
+    for library, benchmark in pairs:
+        pair_runs = { run.get('model'): run for run in runs if (run['library'], run['benchmark']) == (library, benchmark) }
+        report = next((run['report'] for run in pair_runs.values() if 'report' in run), None)
+        benchmark_cell = f'<a href="{html.escape(report)}">{html.escape(benchmark)}</a>' if report else html.escape(benchmark)
+        html_content += f"<tr><td>{html.escape(library)}</td><td>{benchmark_cell}</td>"
+        if None in pair_runs:
+            # the pair could not be run at all
+            html_content += f'<td colspan="{len(models) * (len(k_values) + 1)}" class="error">{html.escape(pair_runs[None]["error"])}</td>'
+        else:
+            for model in models:
+                run = pair_runs.get(model)
+                if (run is None) or ('error' in run):
+                    error = run['error'] if run is not None else 'N/A'
+                    html_content += f'<td colspan="{len(k_values) + 1}" class="error">{html.escape(error)}</td>'
+                else:
+                    html_content += "".join(f"<td>{run_benchmark.format_metric(run[f'recall@{k}'], '{:.1%}')}</td>" for k in k_values)
+                    html_content += f"<td>{run_benchmark.format_metric(run[f'mrr@{k_values[-1]}'], '{:.3f}')}</td>"
+        html_content += "</tr>"
+
+    html_content += """
+        </table>
+    </body>
+    </html>
+    """
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the keyword libraries and run their benchmarks, as listed in a pairing file, for several models.")
+    parser.add_argument("--models", required=True, help="Comma-separated list of the names of the models to evaluate")
+    parser.add_argument("--pairs_file", default="./benchmark/jdd_bench_pairs.tsv", help="TSV file listing the library and the benchmark of each pair (default: ./benchmark/jdd_bench_pairs.tsv)")
+    parser.add_argument("--library_directory", help="Directory containing the libraries, as <library>.json files (default: the 'Sophie JDD' directory next to the pairs file)")
+    parser.add_argument("--benchmark_directory", help="Directory containing the benchmarks, as <benchmark>.tsv files (default: the 'Sophie Benchmaks' directory next to the pairs file)")
+    parser.add_argument("--db_path", default="./chromadb/suite", help="Path to the database where the libraries are stored (default: ./chromadb/suite)")
+    parser.add_argument("--backend", default="chroma", choices=vector_store.backends, help="Vector store holding the embeddings (default: chroma)")
+    parser.add_argument("--k_values", default="1,3,5", help="Comma-separated list of numbers of matches to study (default: 1,3,5)")
+    parser.add_argument("--jobs", default=1, type=int, help="Number of searches run simultaneously (default: 1)")
+    parser.add_argument("--embedding_cache_size", type=int, default=256, help="Maximum size (in MB) of the cache of the query embeddings computed by remote models, 0 to disable it (default: 256)")
+    parser.add_argument("--metrics_file", help="Path to a JSON file (or CSV file, with a .csv extension) where the metrics of all the runs are written")
+    parser.add_argument("report_directory", help="Directory where the report of the suite (index.html) and the report of each pair are generated")
+
+    args = parser.parse_args()
+    try:
+        k_values = sorted({ int(k) for k in args.k_values.split(',') })
+    except ValueError:
+        parser.error("--k_values must be a comma-separated list of integers")
+    if k_values[0] < 1:
+        parser.error("--k_values must only contain positive integers")
+    if args.jobs < 1:
+        parser.error("--jobs must be a positive integer")
+    pairs_directory = os.path.dirname(args.pairs_file)
+    library_directory = args.library_directory or os.path.join(pairs_directory, "Sophie JDD")
+    benchmark_directory = args.benchmark_directory or os.path.join(pairs_directory, "Sophie Benchmaks")
+
+    model_names = args.models.split(',')
+    models = [common.parse_model_and_host(model)[0] for model in model_names]
+    hosts = [common.parse_model_and_host(model)[1] for model in model_names]
+    pairs = read_pairs(args.pairs_file)
+
+    # The models are loaded once and the query embeddings are cached for the whole suite
+    model_db.setup_database(args.db_path)
+    registry.set_embedding_cache_size(args.embedding_cache_size * 1024 * 1024)
+    registry.preload(args.db_path, model_names)
+    os.makedirs(args.report_directory, exist_ok=True)
+
+    # Fill each library (once, even if it is used by several benchmarks) in its own project
+    library_errors = {}
+    for library in dict.fromkeys(library for library, _ in pairs):
+        library_file = os.path.join(library_directory, f"{library}.json")
+        for model, host, model_name in zip(models, hosts, model_names):
+            print(f"Filling library {library} with model {model_name}", flush=True)
+            try:
+                statistics = vector_db.fill_database_by_chunks(args.db_path, model, host, get_project_name(library), keyword_reader.read_keywords(library_file), args.backend, sync=True)
+                print(f"{statistics['embedded']} texts embedded, {statistics['skipped']} texts skipped (unchanged), {statistics['deleted']} texts deleted", flush=True)
+            except Exception as e:
+                library_errors[library] = f"Cannot fill library {library}: {e}"
+                print(library_errors[library], flush=True)
+                break
+
+    # Run each benchmark against its library
+    runs = []
+    for library, benchmark in pairs:
+        if library in library_errors:
+            runs.append({ 'library': library, 'benchmark': benchmark, 'error': library_errors[library] })
+            continue
+        benchmark_file = os.path.join(benchmark_directory, f"{benchmark}.tsv")
+        print(f"Running benchmark {benchmark} against library {library}", flush=True)
+        try:
+            timings = {}
+            results = run_benchmark.process_file(benchmark_file, hosts, models, args.db_path, get_project_name(library), k_values[-1], args.jobs, backend=args.backend, timings=timings)
+        except Exception as e:
+            runs.append({ 'library': library, 'benchmark': benchmark, 'error': f"Cannot run benchmark {benchmark}: {e}" })
+            print(runs[-1]['error'], flush=True)
+            continue
+        report = f"{re.sub('[^a-zA-Z0-9_.]', '_', library)}-{re.sub('[^a-zA-Z0-9_.]', '_', benchmark)}.html"
+        metrics = benchmark_metrics.compute_metrics(results, timings, k_values)
+        run_benchmark.generate_html(os.path.join(args.report_directory, report), results, metrics, k_values)
+        for model, model_metrics in metrics.items():
+            runs.append({ 'library': library, 'benchmark': benchmark, 'model': model, 'report': report, **model_metrics })
+
+    # Generate the aggregated report
+    generate_suite_html(os.path.join(args.report_directory, "index.html"), runs, models, k_values)
+    if args.metrics_file:
+        info = {
+            'backend': args.backend,
+            'k_values': args.k_values,
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds')
+        }
+        benchmark_metrics.write_suite_metrics(args.metrics_file, runs, info)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,44 @@
 from chromadb.api.types import IncludeEnum
-from flask import Flask, jsonify, render_template, request
-import chromadb
-from chromadb.config import Settings
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 import argparse
+import json
 import sys
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+from typing import Any, Iterator
 import webbrowser
 import numpy as np
 from sklearn.decomposition import PCA
 
 import common
+import http_transport
 import model_db
+import query_coalescer
+import registry
 import vector_db
+import vector_store
 
 app = Flask(__name__)
 db_path = None  # Will be set from command line argument
+backend = "chroma"  # Will be set from command line argument
 port = 5000
+projection_directory_name = "projections"  # folder (in the database folder) where the computed projections are stored
+max_exact_pca_size = 5000  # number of vectors above which the PCA is computed with a randomized SVD
+default_page_size = 100  # number of documents per page of /keywords/page
+max_page_size = 1000
+search_threads = 4  # number of threads running the searches in a process
+search_executor: ThreadPoolExecutor|None = None
+search_executor_lock = threading.Lock()
+query_timeout = 60  # maximum duration (in seconds) of a search
+query_results_size = 5  # number of matches returned by /query
+max_batch_queries = 10000  # maximum number of queries of a /query/batch request
+max_batch_results = 100  # maximum number of matches per query of a /query/batch request
+keywords_snapshot: tuple[str, bytes]|None = None  # version and JSON answer of /keywords
+keywords_snapshot_lock = threading.Lock()
+search_coalescer = query_coalescer.QueryCoalescer(lambda: get_search_executor())  # coalesces and caches the searches of /query
 
 def get_database_content() -> dict:
 
@@ -23,17 +46,12 @@ def get_database_content() -> dict:
 
     collections_data = {}
 
-    client = chromadb.PersistentClient(path=db_path, settings=Settings(anonymized_telemetry=False))
-    collection_names = client.list_collections()
-    for name in collection_names:
-        # Get the collection
-        collection = client.get_collection(name)
-        model_id = common.get_model_id(name)
-        model_info = model_db.get_model_and_host(db_path, model_id)
-        model = model_info['model']
-        host = model_info['host']
-        project = common.get_project_name(name)
-        keyword_type = common.get_keyword_type(name)
+    # The models, projects, keyword types, and dimensions are read from the catalog of the model database
+    for entry, collection in get_collections():
+        model = entry['model']
+        host = entry['host']
+        project = entry['project']
+        keyword_type = entry['keyword_type']
 
         # Get all documents in the collection
         results = collection.get(include=[IncludeEnum.documents])
@@ -45,10 +63,7 @@ def get_database_content() -> dict:
 
         # Initialize the data structure for the model (if not already done)
         if model not in collections_data:
-            embeddings = collection.get(include=[IncludeEnum.embeddings])
-            assert embeddings['embeddings'] is not None
-            dimension = len(embeddings['embeddings'][0])
-            collections_data[model] = {'metadata': {'dimension': dimension}, 'projects': {project: {'keywords': {}}}}
+            collections_data[model] = {'metadata': {'dimension': entry['dimension']}, 'projects': {project: {'keywords': {}}}}
             if host:
                 collections_data[model]['metadata']['host'] = host
 
@@ -57,30 +72,164 @@ def get_database_content() -> dict:
             collections_data[model]['projects'][project] = {'keywords': {}}
 
         # Create a list of documents with their IDs
+        texts = dict(zip(results['ids'], results['documents']))
         documents = []
-        for doc_id, document in zip(results['ids'], results['documents']):
+        for doc_id, document in texts.items():
             if common.get_document_type(doc_id) == 'keyword':
                 data = {
                     'id': common.get_external_id(doc_id),
                     'keyword': document
                 }
                 description_id = common.get_internal_id_of_description(doc_id)
-                if description_id in results['ids']:
-                    data['description'] = results['documents'][results['ids'].index(description_id)]    
+                if description_id in texts:
+                    data['description'] = texts[description_id]
                 documents.append(data)
         collections_data[model]['projects'][project]['keywords'][keyword_type] = documents
     
     return collections_data
 
+def get_database_version() -> str:
+    """
+    Return a version of the database content, which changes whenever a collection is filled.
+    It is computed from the fingerprints of the collections stored in the catalog of the model database.
+    """
+    assert db_path is not None
+
+    return model_db.get_catalog_version(db_path, backend)
+
+def update_catalog() -> None:
+    """
+    Add to the catalog of the model database the collections which are not in it
+    (i.e. the ones filled before the catalog existed).
+    """
+    assert db_path is not None
+
+    model_db.setup_database(db_path)
+    client = registry.get_client(db_path, backend)
+    for name in client.list_collections():
+        model_id = common.get_model_id(name)
+        project = common.get_project_name(name)
+        keyword_type = common.get_keyword_type(name)
+        if model_db.get_collection(db_path, backend, model_id, project, keyword_type) is None:
+            print(f"Adding collection {name} to the catalog", flush=True)
+            vector_db.update_catalog(db_path, backend, model_id, project, keyword_type, client.get_collection(name))
+
+def get_keywords_snapshot() -> tuple[str, bytes]:
+    """
+    Return the version and the JSON answer of /keywords.
+    The answer is built once and then reused until the database files are modified.
+    """
+    global keywords_snapshot
+    version = get_database_version()
+    with keywords_snapshot_lock:
+        if (keywords_snapshot is None) or (keywords_snapshot[0] != version):
+            body = app.json.dumps({
+                'status': 'success',
+                'data': get_database_content()
+            }).encode('utf-8')
+            keywords_snapshot = (version, body)
+        return keywords_snapshot
+
+def get_collections(model: str|None = None, host: str|None = None, project: str|None = None, keyword_type: str|None = None) -> Iterator[tuple[dict, Any]]:
+    """
+    Iterate over the non-empty collections of the database, optionally filtered by model (and host), project, and keyword type.
+
+    Yields:
+        Tuples of (catalog entry as returned by model_db.get_collections, collection).
+    """
+    assert db_path is not None
+
+    model_id = None
+    if model is not None:
+        model_id = model_db.get_model_id(db_path, model, host)
+        if model_id is None:
+            return
+    client = registry.get_client(db_path, backend)
+    for entry in model_db.get_collections(db_path, backend, model_id, project, keyword_type):
+        if entry['document_count'] > 0:
+            yield entry, client.get_collection(common.get_collection_name(entry['model_id'], entry['project'], entry['keyword_type']))
+
+def get_database_index(model: str|None = None, host: str|None = None, project: str|None = None) -> dict:
+    """
+    Return the tree of the models, projects, and keyword types of the database (like get_database_content, but without the keywords).
+    Each keyword type contains the number of documents (keywords and descriptions) of its collection.
+    The tree is built from the catalog of the model database, without accessing the vector store.
+    """
+    assert db_path is not None
+
+    model_id = None
+    if model is not None:
+        model_id = model_db.get_model_id(db_path, model, host)
+        if model_id is None:
+            return {}
+    index = {}
+    for entry in model_db.get_collections(db_path, backend, model_id, project):
+        if entry['document_count'] == 0:
+            continue
+        model_name = entry['model']
+        if model_name not in index:
+            index[model_name] = {'metadata': {'dimension': entry['dimension']}, 'projects': {}}
+            if entry['host']:
+                index[model_name]['metadata']['host'] = entry['host']
+        index[model_name]['projects'].setdefault(entry['project'], {'keywords': {}})['keywords'][entry['keyword_type']] = {'documents': entry['document_count']}
+    return index
+
+def get_keywords_page(collection: Any, cursor: int, limit: int) -> tuple[list[dict], int|None]:
+    """
+    Return a page of the keywords of a collection.
+
+    Args:
+        collection: The collection.
+        cursor: The position of the first document of the page.
+        limit: The number of documents (keywords and descriptions) to read.
+
+    Returns:
+        The keywords (with their id and description) of the page, and the cursor of the next page (None if this is the last page).
+    """
+    results = collection.get(limit=limit, offset=cursor, include=[IncludeEnum.documents])
+    assert results['documents'] is not None
+    keyword_ids = [doc_id for doc_id in results['ids'] if common.get_document_type(doc_id) == 'keyword']
+    descriptions = vector_db.get_documents(collection, [common.get_internal_id_of_description(doc_id) for doc_id in keyword_ids])
+    keywords = []
+    for doc_id, document in zip(results['ids'], results['documents']):
+        if common.get_document_type(doc_id) == 'keyword':
+            data = {
+                'id': common.get_external_id(doc_id),
+                'keyword': document
+            }
+            description_id = common.get_internal_id_of_description(doc_id)
+            if description_id in descriptions:
+                data['description'] = descriptions[description_id]
+            keywords.append(data)
+    next_cursor = cursor + len(results['ids']) if len(results['ids']) == limit else None
+    return keywords, next_cursor
+
 def get_projected_vectors(db_path: str, model:str, host:str|None, project:str, keyword_type:str) -> list:
 
     model_id = model_db.get_model_id(db_path, model, host)
     if model_id is None:
         raise Exception(f"No known model for model={model} and host={host}")
     collection_name = common.get_collection_name(model_id, project, keyword_type)
-    client = chromadb.PersistentClient(path=db_path, settings=Settings(anonymized_telemetry=False))
+    client = registry.get_client(db_path, backend)
     collection = client.get_collection(collection_name)
 
+    # Get the fingerprint of the collection content from the catalog (or compute it without loading the embeddings)
+    # and reuse the projections computed for this content, if any
+    entry = model_db.get_collection(db_path, backend, model_id, project, keyword_type)
+    if entry is not None:
+        fingerprint = entry['fingerprint']
+    else:
+        contents = collection.get(include=[IncludeEnum.documents, IncludeEnum.metadatas])
+        assert contents['documents'] is not None
+        assert contents['metadatas'] is not None
+        fingerprint = common.get_collection_fingerprint(contents['ids'], contents['documents'], contents['metadatas'])
+    projection_file = os.path.join(db_path, projection_directory_name, f"{backend}-{collection_name}.json")
+    if os.path.exists(projection_file):
+        with open(projection_file, 'r', encoding='utf-8') as file:
+            projections = json.load(file)
+        if projections['fingerprint'] == fingerprint:
+            return projections['data']
+
     # Get all items from the collection
     results = collection.get(include=[IncludeEnum.embeddings, IncludeEnum.documents])
     assert results['embeddings'] is not None
@@ -89,13 +238,17 @@ def get_projected_vectors(db_path: str, model:str, host:str|None, project:str, k
     # Extract embeddings
     vectors = np.array(results['embeddings'])
 
-    # Initialize PCA
-    pca = PCA(n_components=3)
+    # Initialize PCA (for large collections, a randomized SVD keeps the computation time bounded)
+    if len(vectors) > max_exact_pca_size:
+        pca = PCA(n_components=3, svd_solver='randomized', random_state=0)
+    else:
+        pca = PCA(n_components=3)
     
     # Fit and transform the vectors
     projected_vectors = pca.fit_transform(vectors)
 
     # Create a list of documents with their IDs
+    positions = { doc_id: i for i, doc_id in enumerate(results['ids']) }
     data = []
     for doc_projection, document, doc_id in zip(projected_vectors, results['documents'], results['ids']):
         if common.get_document_type(doc_id) == 'keyword':
@@ -104,16 +257,81 @@ def get_projected_vectors(db_path: str, model:str, host:str|None, project:str, k
                 'keyword': document
             }
             description_id = common.get_internal_id_of_description(doc_id)
-            if description_id in results['ids']:
-                d['description'] = results['documents'][results['ids'].index(description_id)]    
-                d['description_projection'] = projected_vectors[results['ids'].index(description_id)].tolist()
+            if description_id in positions:
+                d['description'] = results['documents'][positions[description_id]]
+                d['description_projection'] = projected_vectors[positions[description_id]].tolist()
             data.append(d)
+
+    # Store the projections for the next requests
+    # (the temporary file is unique, since several threads or worker processes may compute the same projections)
+    os.makedirs(os.path.dirname(projection_file), exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(projection_file), suffix='.tmp', delete=False) as file:
+        json.dump({'fingerprint': fingerprint, 'data': data}, file)
+    os.replace(file.name, projection_file)
     return data
-    
+
+def get_search_executor() -> ThreadPoolExecutor:
+    """
+    Return the pool of threads running the searches (i.e. the embedding computations) of this process.
+    The pool is created on first use, so that each worker process of the production server gets its own.
+    """
+    global search_executor
+    with search_executor_lock:
+        if search_executor is None:
+            search_executor = ThreadPoolExecutor(max_workers=search_threads, thread_name_prefix='search')
+        return search_executor
+
+def serve(workers: int, threads: int) -> None:
+    """
+    Run the production server: a Gunicorn server with several worker processes, each one handling several requests at once.
+    The application (and the preloaded models) are loaded before the workers are forked, so they share the model weights.
+    """
+    # Gunicorn is only needed (and only available on Unix) for the production server
+    from gunicorn.app.base import BaseApplication
+
+    def post_fork(server, worker):
+        # The database connections of the parent process must not be used by the workers
+        registry.forget_connections()
+        model_db.forget_connections()
+        http_transport.default_transport.forget_sessions()
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'0.0.0.0:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            self.cfg.set('preload_app', True)
+            self.cfg.set('timeout', query_timeout + 30)
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            return app
+
+    ProductionServer().run()
+
 @app.route('/keywords', methods=['GET'])
 def get_keywords():
     try:
-        data = get_database_content()
+        version, body = get_keywords_snapshot()
+        response = Response(body, mimetype='application/json')
+        response.set_etag(version)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr, flush=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/keywords/index', methods=['GET'])
+def get_keywords_index():
+    host = request.args.get('host')
+    if host == '':
+        host = None
+    try:
+        data = get_database_index(request.args.get('model'), host, request.args.get('project'))
         return jsonify({
             'status': 'success',
             'data': data
@@ -125,6 +343,69 @@ def get_keywords():
             'message': str(e)
         }), 500
 
+@app.route('/keywords/page', methods=['GET'])
+def get_keywords_page_of_collection():
+    model = request.args.get('model')
+    host = request.args.get('host')
+    if host == '':
+        host = None
+    project = request.args.get('project')
+    keyword_type = request.args.get('keyword-type')
+    try:
+        cursor = int(request.args.get('cursor', 0))
+        limit = min(int(request.args.get('limit', default_page_size)), max_page_size)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'cursor and limit must be integers'}), 400
+    if (cursor < 0) or (limit < 1):
+        return jsonify({'status': 'error', 'message': 'cursor must not be negative and limit must be positive'}), 400
+    if not model or not project or not keyword_type:
+        return jsonify({'status': 'error', 'message': 'Both model, project, and keyword-type parameters are required'}), 400
+
+    try:
+        collections = list(get_collections(model, host, project, keyword_type))
+        if collections == []:
+            return jsonify({'status': 'error', 'message': f'No collection for model={model}, host={host}, project={project}, and keyword-type={keyword_type}'}), 404
+        keywords, next_cursor = get_keywords_page(collections[0][1], cursor, limit)
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'keywords': keywords,
+                'next_cursor': next_cursor
+            }
+        })
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr, flush=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/keywords.ndjson', methods=['GET'])
+def stream_keywords():
+    model = request.args.get('model')
+    host = request.args.get('host')
+    if host == '':
+        host = None
+    project = request.args.get('project')
+    keyword_type = request.args.get('keyword-type')
+
+    def generate() -> Iterator[str]:
+        # The keywords are read page by page, so the whole content is never held in memory
+        for entry, collection in get_collections(model, host, project, keyword_type):
+            cursor: int|None = 0
+            while cursor is not None:
+                keywords, cursor = get_keywords_page(collection, cursor, max_page_size)
+                for keyword in keywords:
+                    yield json.dumps({
+                        'model': entry['model'],
+                        'host': entry['host'],
+                        'project': entry['project'],
+                        'keyword_type': entry['keyword_type'],
+                        **keyword
+                    }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/projections', methods=['GET'])
 def get_projections():
 
@@ -159,13 +440,92 @@ def get_search_results():
     project = request.args.get('project')
     keyword_type = request.args.get('keyword-type')
     query = request.args.get('query')
+    client = request.args.get('client') or None
+    seq = request.args.get('seq')
     
     if not model or not project or not keyword_type or not query:
         return jsonify({'error': 'Both model, project, keyword-type, and query parameters are required'}), 400
+    try:
+        seq = int(seq) if seq is not None else None
+    except ValueError:
+        return jsonify({'error': 'seq must be an integer'}), 400
     
     try:
-        results = vector_db.search_keywords(db_path, host, model, project, keyword_type, query, 5)
+        # The database version is part of the key, so the cached results are not used once the database is modified
+        key = (get_database_version(), model, host, project, keyword_type, query)
+        future = search_coalescer.submit(key, vector_db.search_keywords, db_path, host, model, project, keyword_type, query, query_results_size, backend, client=client, seq=seq)
+        if future is None:
+            return jsonify({'error': 'The search has been superseded by a more recent one', 'superseded': True}), 409
+        results = future.result(timeout=query_timeout)
+        if search_coalescer.is_superseded(client, seq):
+            return jsonify({'error': 'The search has been superseded by a more recent one', 'superseded': True}), 409
         return jsonify(results)
+    except CancelledError:
+        return jsonify({'error': 'The search has been superseded by a more recent one', 'superseded': True}), 409
+    except TimeoutError:
+        return jsonify({'error': f'The search did not complete within {query_timeout} seconds'}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/query/batch', methods=['POST'])
+def get_batch_search_results():
+    """
+    Search many keywords at once.
+    The body is a JSON object containing:
+    - project: the name of the project,
+    - queries: the list of the searches, each one being an object containing a keyword_type and a query,
+    - models: the list of the models (as "model" or "model@host" strings), or model (and optionally host) for a single model,
+    - nb_results: the number of matches per query (default: 5).
+    The queries of a model are embedded together and the models are searched in parallel.
+    """
+    assert db_path is not None
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'error': 'The body must be a JSON object'}), 400
+    project = body.get('project')
+    queries = body.get('queries')
+    if 'models' in body:
+        models = body['models']
+    elif body.get('model'):
+        models = [f"{body['model']}@{body['host']}" if body.get('host') else body['model']]
+    else:
+        models = None
+    nb_results = body.get('nb_results', query_results_size)
+
+    if not project or not isinstance(models, list) or not models or not all(isinstance(model_name, str) for model_name in models) or not isinstance(queries, list):
+        return jsonify({'error': 'Both project, queries, and model (or models) parameters are required'}), 400
+    if len(queries) > max_batch_queries:
+        return jsonify({'error': f'At most {max_batch_queries} queries can be sent at once'}), 400
+    if not isinstance(nb_results, int) or (nb_results < 1) or (nb_results > max_batch_results):
+        return jsonify({'error': f'nb_results must be an integer between 1 and {max_batch_results}'}), 400
+    if not all(isinstance(query, dict) and query.get('keyword_type') and query.get('query') for query in queries):
+        return jsonify({'error': 'Each query must contain a keyword_type and a query'}), 400
+    if not all(query['keyword_type'] in common.keyword_types for query in queries):
+        return jsonify({'error': f"keyword_type can only be {', '.join(common.keyword_types)}"}), 400
+
+    searches = [(query['keyword_type'], query['query']) for query in queries]
+    try:
+        futures = {}
+        for model_name in models:
+            model, host = common.parse_model_and_host(model_name)
+            futures[model_name] = get_search_executor().submit(vector_db.search_keywords_batch, db_path, host, model, project, searches, nb_results, backend)
+        # the models are searched in parallel, so the timeout applies to the whole batch
+        deadline = time.monotonic() + query_timeout
+        results = { model_name: future.result(timeout=max(0.0, deadline - time.monotonic())) for model_name, future in futures.items() }
+        return jsonify({
+            'status': 'success',
+            'data': [
+                {
+                    'keyword_type': keyword_type,
+                    'query': query,
+                    'results': { model_name: results[model_name][i] for model_name in models }
+                }
+                for i, (keyword_type, query) in enumerate(searches)
+            ]
+        })
+    except TimeoutError:
+        return jsonify({'error': f'The search did not complete within {query_timeout} seconds'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -184,9 +544,24 @@ def home():
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description=f'Run a web server (on port {port}) to navigate the Chroma database')
     parser.add_argument("--db_path", default="./chromadb/database", help="Path to the Chroma database (default: ./chromadb/database)")
+    parser.add_argument("--backend", default="chroma", choices=vector_store.backends, help="Vector store holding the embeddings (default: chroma)")
     parser.add_argument("--browser", action="store_true", help="Open the Web Browser after starting the server")
+    parser.add_argument("--memory_budget", type=int, help="Maximum memory (in MB) used by the loaded local embedding models (default: no limit)")
+    parser.add_argument("--embedding_cache_size", type=int, default=256, help="Maximum size (in MB) of the cache of the query embeddings computed by remote models, 0 to disable it (default: 256)")
+    parser.add_argument("--query_cache_size", type=int, default=256, help="Number of recent search results kept in memory, 0 to disable the cache (default: 256)")
+    parser.add_argument("--serve", action="store_true", help="Run the production server (Gunicorn, Unix only) instead of the development server")
+    parser.add_argument("--workers", default=2, type=int, help="Number of worker processes of the production server (default: 2)")
+    parser.add_argument("--threads", default=8, type=int, help="Number of requests handled at once by each worker process of the production server (default: 8)")
+    parser.add_argument("--search_threads", default=4, type=int, help="Number of searches run at once by each process (default: 4)")
+    parser.add_argument("--preload_models", help="Comma-separated list of the names of the models to load at startup")
     args = parser.parse_args()
     db_path = args.db_path
+    backend = args.backend
+    search_threads = args.search_threads
+    if args.memory_budget is not None:
+        registry.set_memory_budget(args.memory_budget * 1024 * 1024)
+    registry.set_embedding_cache_size(args.embedding_cache_size * 1024 * 1024)
+    search_coalescer.max_size = args.query_cache_size
 
     # Check if the path exists
     if not os.path.exists(db_path):
@@ -199,21 +574,29 @@ if __name__ == '__main__':
         sys.exit(1)
 
     # Check for essential Chroma database files/directories
-    if not os.path.exists(os.path.join(db_path, 'chroma.sqlite3')):
+    if backend == "chroma" and not os.path.exists(os.path.join(db_path, 'chroma.sqlite3')):
         print(f"Error: Not a valid Chroma database at {db_path}", file=sys.stderr)
         sys.exit(1)
 
     try:
         # Test database connection and content
-        client = chromadb.PersistentClient(path=db_path, settings=Settings(anonymized_telemetry=False))
+        client = registry.get_client(db_path, backend)
         # Try to list collections to verify database is functional
         client.list_collections()
+        # Make sure that all the collections are in the catalog
+        update_catalog()
     except Exception as e:
         print(f"Error: Failed to connect to Chroma database at {db_path}", file=sys.stderr)
         print(f"Details: {str(e)}")
         sys.exit(1)
 
+    if args.preload_models:
+        registry.preload(db_path, args.preload_models.split(','))
+
     if args.browser:
         webbrowser.open(f'http://localhost:{port}')
 
-    app.run(host='0.0.0.0', port=port, debug=True)
+    if args.serve:
+        serve(args.workers, args.threads)
+    else:
+        app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,110 @@
+import csv
+import json
+import pytest
+from ..benchmark_metrics import compute_metrics, percentile, write_metrics, write_suite_metrics
+
+def make_results(ranks_per_model: dict[str, list[int]]) -> dict[int, dict]:
+    """Build benchmark results where each keyword of each model has the given rank (-1 if not found)."""
+    results = {}
+    for model, ranks in ranks_per_model.items():
+        for index, rank in enumerate(ranks, start=1):
+            results.setdefault(index, {'keyword': f'keyword {index}', 'results': {}})['results'][model] = {'matches': [], 'success': rank}
+    return results
+
+def test_percentile():
+    """Test the nearest-rank percentiles."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+def make_call(queries: int, start: float, total: float, embed: float, query: float, partner: float) -> dict[str, float]:
+    """Build the timings of a search call."""
+    return {'queries': queries, 'start': start, 'end': start + total, 'total': total, 'embed': embed, 'query': query, 'partner': partner}
+
+def test_compute_metrics():
+    """Test the retrieval and performance metrics of a model."""
+    results = make_results({'model': [0, 1, -1, 2]})
+    timings = {'model': [
+        make_call(1, 10.0, 0.1, 0.05, 0.03, 0.01),
+        make_call(1, 10.1, 0.1, 0.05, 0.03, 0.01),
+        make_call(1, 10.2, 0.2, 0.1, 0.02, 0.01),
+        make_call(1, 10.4, 0.4, 0.4, 0.02, 0.01)
+    ]}
+
+    metrics = compute_metrics(results, timings, [3])['model']
+
+    assert metrics['queries'] == 4
+    assert metrics['recall@3'] == pytest.approx(0.75)
+    assert metrics['mrr@3'] == pytest.approx((1 + 1/2 + 1/3) / 4)
+    assert metrics['calls'] == 4
+    assert metrics['qps'] == pytest.approx(5.0)
+    assert metrics['latency_p50'] == pytest.approx(100.0)
+    assert metrics['latency_p99'] == pytest.approx(400.0)
+    assert metrics['embed_time'] == pytest.approx(150.0)
+    assert metrics['query_time'] == pytest.approx(25.0)
+    assert metrics['partner_time'] == pytest.approx(10.0)
+
+def test_compute_metrics_of_simultaneous_batches():
+    """Test that the throughput is computed over the wall-clock time, and that the latency of batched queries is unknown."""
+    results = make_results({'model': [0, 1, -1, 2]})
+    timings = {'model': [make_call(2, 10.0, 0.4, 0.3, 0.05, 0.05), make_call(2, 10.0, 0.4, 0.3, 0.05, 0.05)]}
+
+    metrics = compute_metrics(results, timings, [3])['model']
+
+    assert metrics['qps'] == pytest.approx(10.0)
+    assert metrics['latency_p50'] is None
+    assert metrics['latency_p99'] is None
+
+def test_compute_metrics_without_timings():
+    """Test that the performance metrics are absent when the searches have not been timed."""
+    metrics = compute_metrics(make_results({'model': [-1]}), {}, [3])['model']
+
+    assert metrics['recall@3'] == 0.0
+    assert metrics['mrr@3'] == 0.0
+    assert metrics['qps'] is None
+    assert metrics['latency_p50'] is None
+
+def test_compute_metrics_for_several_k():
+    """Test that the metrics of every k are computed from the same ranks."""
+    results = make_results({'model': [0, 1, 4, 11, -1]})
+
+    metrics = compute_metrics(results, {}, [1, 3, 5, 12])['model']
+
+    assert [metrics[f'recall@{k}'] for k in [1, 3, 5, 12]] == pytest.approx([0.2, 0.4, 0.6, 0.8])
+    assert metrics['mrr@1'] == pytest.approx(1 / 5)
+    assert metrics['mrr@5'] == pytest.approx((1 + 1/2 + 1/5) / 5)
+    assert metrics['mrr@12'] == pytest.approx((1 + 1/2 + 1/5 + 1/12) / 5)
+
+@pytest.mark.parametrize("file_name", ['metrics.json', 'metrics.csv'])
+def test_write_metrics(tmp_path, file_name):
+    """Test writing the metrics as JSON or CSV."""
+    metrics = compute_metrics(make_results({'first': [0], 'second': [-1]}), {}, [3])
+    file_path = str(tmp_path / file_name)
+
+    write_metrics(file_path, metrics, {'benchmark': 'bench.tsv'})
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        if file_name.endswith('.csv'):
+            rows = list(csv.DictReader(file))
+            assert [(row['benchmark'], row['model'], row['recall@3']) for row in rows] == [('bench.tsv', 'first', '1.0'), ('bench.tsv', 'second', '0.0')]
+        else:
+            data = json.load(file)
+            assert data['benchmark'] == 'bench.tsv'
+            assert data['models']['first']['recall@3'] == 1.0
+
+def test_write_suite_metrics_as_csv(tmp_path):
+    """Test writing the metrics of several runs, a failed run having no metric."""
+    runs = [
+        {'library': 'jdd1', 'benchmark': 'bench_jdd1', 'model': 'first', **compute_metrics(make_results({'first': [0]}), {}, [1])['first']},
+        {'library': 'jdd2', 'benchmark': 'bench_jdd2', 'error': 'Cannot run benchmark bench_jdd2'}
+    ]
+    file_path = str(tmp_path / 'suite.csv')
+
+    write_suite_metrics(file_path, runs, {'backend': 'numpy'})
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert [(row['backend'], row['library'], row['recall@1'], row['error']) for row in rows] == [('numpy', 'jdd1', '1.0', ''), ('numpy', 'jdd2', '', 'Cannot run benchmark bench_jdd2')]
@@ -0,0 +1,56 @@
+import pytest
+from ..common import get_collection_fingerprint, get_content_hash, split_into_batches, split_into_chunks
+
+def test_split_into_batches_empty():
+    """Test splitting no text."""
+    assert split_into_batches([], 10, 100) == []
+
+def test_split_into_batches_single_batch():
+    """Test that texts respecting the limits are kept in a single batch."""
+    assert split_into_batches(['one', 'two', 'three'], 10, 100) == [['one', 'two', 'three']]
+
+def test_split_into_batches_max_batch_size():
+    """Test that the batches respect the maximum number of texts."""
+    texts = [str(i) for i in range(7)]
+
+    batches = split_into_batches(texts, 3, 100)
+
+    assert batches == [['0', '1', '2'], ['3', '4', '5'], ['6']]
+
+def test_split_into_batches_max_payload_size():
+    """Test that the batches respect the maximum payload size."""
+    texts = ['aaaa', 'bbbb', 'cc', 'dddddd']
+
+    batches = split_into_batches(texts, 10, 6)
+
+    assert batches == [['aaaa'], ['bbbb', 'cc'], ['dddddd']]
+
+def test_split_into_batches_payload_size_is_in_bytes():
+    """Test that the payload size is computed on the UTF-8 encoding."""
+    batches = split_into_batches(['éé', 'èè'], 10, 4)
+
+    assert batches == [['éé'], ['èè']]
+
+def test_split_into_batches_oversized_text():
+    """Test that a text larger than the maximum payload size gets its own batch."""
+    batches = split_into_batches(['a', 'very long text', 'b'], 10, 5)
+
+    assert batches == [['a'], ['very long text'], ['b']]
+
+def test_collection_fingerprint_does_not_depend_on_order():
+    """Test that the fingerprint does not depend on the order of the documents and uses the stored hashes."""
+    fingerprint = get_collection_fingerprint(['1-k', '2-k'], ['one', 'two'], [{'hash': get_content_hash('one')}, None])
+    assert get_collection_fingerprint(['2-k', '1-k'], ['two', 'one'], [None, None]) == fingerprint
+    assert get_collection_fingerprint(['2-k', '1-k'], ['two', 'three'], [None, None]) != fingerprint
+
+def test_split_into_chunks():
+    """Test splitting lazily read items into chunks of a fixed size."""
+    assert list(split_into_chunks(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(split_into_chunks([], 3)) == []
+
+def test_split_into_chunks_rejects_invalid_size():
+    """Test that a chunk size lower than 1 is rejected."""
+    with pytest.raises(ValueError):
+        split_into_chunks([1, 2], 0)
+    with pytest.raises(ValueError):
+        split_into_chunks([1, 2], -1)
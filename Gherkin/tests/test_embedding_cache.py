@@ -0,0 +1,70 @@
+import os
+import pytest
+import numpy as np
+from ..embedding_cache import (
+    EmbeddingCache,
+    database_name
+)
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fixture to provide a cache in a temporary directory."""
+    cache = EmbeddingCache(str(tmp_path))
+    yield cache
+    cache.close()
+
+def test_cache_file_is_created(tmp_path, cache):
+    """Test that the cache is stored in the database directory."""
+    assert os.path.exists(f"{tmp_path}/{database_name}")
+
+def test_get_missing_embeddings(cache):
+    """Test that unknown texts are reported as missing."""
+    assert cache.get("Cohere", "embed-multilingual-v3.0", ["one", "two"]) == [None, None]
+
+def test_put_and_get_embeddings(cache):
+    """Test storing and retrieving embeddings."""
+    cache.put("Cohere", "embed-multilingual-v3.0", ["one", "two"], [[1.0, 2.0], [3.0, 4.0]])
+
+    embeddings = cache.get("Cohere", "embed-multilingual-v3.0", ["two", "three", "one"])
+
+    assert np.array_equal(embeddings[0], np.array([3.0, 4.0], dtype=np.float32))
+    assert embeddings[1] is None
+    assert np.array_equal(embeddings[2], np.array([1.0, 2.0], dtype=np.float32))
+
+def test_embeddings_are_keyed_by_model_and_host(cache):
+    """Test that the embeddings of a model are not returned for another model or host."""
+    cache.put("Cohere", "embed-multilingual-v3.0", ["one"], [[1.0, 2.0]])
+
+    assert cache.get("Cohere", "embed-multilingual-light-v3.0", ["one"]) == [None]
+    assert cache.get("Mistral", "embed-multilingual-v3.0", ["one"]) == [None]
+    assert cache.get(None, "embed-multilingual-v3.0", ["one"]) == [None]
+
+def test_cache_is_persistent(tmp_path, cache):
+    """Test that the embeddings are still available after reopening the cache."""
+    cache.put("Gemini", "models/text-embedding-004", ["one"], [[1.0, 2.0]])
+    cache.close()
+
+    reopened_cache = EmbeddingCache(str(tmp_path))
+    embeddings = reopened_cache.get("Gemini", "models/text-embedding-004", ["one"])
+    reopened_cache.close()
+
+    assert np.array_equal(embeddings[0], np.array([1.0, 2.0], dtype=np.float32))
+
+def test_least_recently_used_embeddings_are_evicted(tmp_path):
+    """Test that the least recently used embeddings are evicted when the cache is too large."""
+    # Arrange
+    cache = EmbeddingCache(str(tmp_path), max_size=2 * 4 * 4)  # room for two vectors of 4 float32
+    cache.put("Mistral", "mistral-embed", ["one"], [[1.0] * 4])
+    cache.put("Mistral", "mistral-embed", ["two"], [[2.0] * 4])
+    cache.get("Mistral", "mistral-embed", ["one"])
+
+    # Act
+    cache.put("Mistral", "mistral-embed", ["three"], [[3.0] * 4])
+
+    # Assert
+    embeddings = cache.get("Mistral", "mistral-embed", ["one", "two", "three"])
+    assert embeddings[0] is not None
+    assert embeddings[1] is None
+    assert embeddings[2] is not None
+    assert cache.size() == 2 * 4 * 4
+    cache.close()
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from ..http_transport import Transport, get_retry_after
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Stub embedding host: answers with the statuses queued in the server, then with 200."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        payload = json.loads(self.rfile.read(length))
+        self.server.client_ports.append(self.client_address[1])
+        with self.server.lock:
+            status, headers = self.server.statuses.pop(0) if self.server.statuses else (200, {})
+        body = json.dumps({'echo': payload}).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    """Fixture to provide a stub HTTP server running in a thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.statuses = []
+    server.client_ports = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def get_url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/embed"
+
+def test_post_returns_answer(server):
+    """Test a successful request."""
+    transport = Transport()
+
+    response = transport.post(get_url(server), {"Content-Type": "application/json"}, {"texts": ["one"]})
+
+    assert response.status_code == 200
+    assert response.json() == {'echo': {'texts': ["one"]}}
+    transport.close()
+
+def test_connection_is_kept_alive(server):
+    """Test that successive requests to the same host reuse the same connection."""
+    transport = Transport()
+
+    for _ in range(3):
+        transport.post(get_url(server), {}, {})
+
+    assert len(set(server.client_ports)) == 1
+    transport.close()
+
+def test_retry_on_server_error(server):
+    """Test that a request failing with a 5xx status is retried."""
+    server.statuses = [(503, {}), (500, {})]
+    transport = Transport(backoff_factor=0)
+
+    response = transport.post(get_url(server), {}, {})
+
+    assert response.status_code == 200
+    assert len(server.client_ports) == 3
+    transport.close()
+
+def test_retry_after_is_honored(server):
+    """Test that the delay requested by the Retry-After header of a 429 answer is respected."""
+    server.statuses = [(429, {"Retry-After": "1"})]
+    transport = Transport(backoff_factor=0)
+
+    start = time.monotonic()
+    response = transport.post(get_url(server), {}, {})
+
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 1
+    transport.close()
+
+def test_retry_after_is_capped(server):
+    """Test that a Retry-After delay longer than the maximum backoff is shortened to it."""
+    server.statuses = [(503, {"Retry-After": "86400"})]
+    transport = Transport(backoff_factor=0, max_backoff=0.1)
+
+    start = time.monotonic()
+    response = transport.post(get_url(server), {}, {})
+
+    assert response.status_code == 200
+    assert time.monotonic() - start < 5
+    transport.close()
+
+def test_error_is_returned_after_max_retries(server):
+    """Test that the last error answer is returned when all the retries have failed."""
+    server.statuses = [(500, {})] * 3
+    transport = Transport(max_retries=2, backoff_factor=0)
+
+    response = transport.post(get_url(server), {}, {})
+
+    assert response.status_code == 500
+    assert len(server.client_ports) == 3
+    transport.close()
+
+def test_client_error_is_not_retried(server):
+    """Test that a 4xx error (other than 429) is not retried."""
+    server.statuses = [(401, {})]
+    transport = Transport(backoff_factor=0)
+
+    response = transport.post(get_url(server), {}, {})
+
+    assert response.status_code == 401
+    assert len(server.client_ports) == 1
+    transport.close()
+
+def test_connection_error_is_raised():
+    """Test that a connection error is raised when all the retries have failed."""
+    transport = Transport(max_retries=1, backoff_factor=0, timeout=1)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport.post("http://127.0.0.1:9/embed", {}, {})
+    transport.close()
+
+def test_get_retry_after():
+    """Test the parsing of the Retry-After header."""
+    response = requests.Response()
+    assert get_retry_after(response) is None
+    response.headers["Retry-After"] = "2.5"
+    assert get_retry_after(response) == 2.5
+    response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert get_retry_after(response) == 0.0
+    response.headers["Retry-After"] = "soon"
+    assert get_retry_after(response) is None
@@ -1,4 +1,6 @@
-from ..keyword_extractor import consolidate_keywords, condense_keyword
+import json
+import pytest
+from ..keyword_extractor import KeywordConsolidator, consolidate_keywords, condense_keyword, get_keyword_id, process_feature_files
 
 
 def consolidate(new_keywords: list[dict[str, str]], all_keywords: list[dict[str, str]]) -> None:
@@ -141,3 +143,119 @@ def test_consolidate_keywords_embeding_string_parameter_float_integer_with_dupli
     assert any(kw['keyword'] == 'My "green" object has 7 items of type <water> and costs $96.1' for kw in all_keywords)
     assert any(kw['keyword'] == 'Two' for kw in all_keywords)
     assert any(kw['keyword'] == 'Three' for kw in all_keywords)
+
+
+def test_consolidator_merges_files_one_by_one():
+    """Test that the consolidator keeps the longest keyword when the keywords are added file by file"""
+    # Arrange
+    consolidator = KeywordConsolidator()
+
+    # Act
+    consolidator.add_all(add_condensed_keywords([
+        {'type': 'Context', 'keyword': 'I have 2 apples'},
+        {'type': 'Outcome', 'keyword': 'I have 2 apples'}
+    ]))
+    consolidator.add_all(add_condensed_keywords([
+        {'type': 'Context', 'keyword': 'I have 12 apples'},
+        {'type': 'Context', 'keyword': 'I have 3 pears'}
+    ]))
+    consolidator.add_all(add_condensed_keywords([
+        {'type': 'Context', 'keyword': 'I have 5 apples'}
+    ]))
+
+    # Assert
+    assert len(consolidator) == 3
+    assert [(kw['type'], kw['keyword']) for kw in consolidator.get_keywords()] == [
+        ('Outcome', 'I have 2 apples'),
+        ('Context', 'I have 12 apples'),
+        ('Context', 'I have 3 pears')
+    ]
+
+
+def test_consolidator_replaces_keyword_of_same_length():
+    """Test that, for keywords of the same length, the last added one is kept"""
+    # Arrange
+    consolidator = KeywordConsolidator(add_condensed_keywords([{'type': 'Action', 'keyword': 'I pay 10 euros'}]))
+
+    # Act
+    consolidator.add(add_condensed_keywords([{'type': 'Action', 'keyword': 'I pay 20 euros'}])[0])
+
+    # Assert
+    assert [kw['keyword'] for kw in consolidator.get_keywords()] == ['I pay 20 euros']
+
+
+def write_feature_file(path, steps: list[str]) -> None:
+    """Write a feature file containing a single scenario"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("Feature: My feature\n  Scenario: My scenario\n" + "".join(f"    {step}\n" for step in steps), encoding='utf-8')
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_process_feature_files_walks_directories_and_reports_errors(tmp_path, jobs):
+    """Test that the directories are walked recursively and that the invalid files are reported without stopping the extraction"""
+    # Arrange
+    write_feature_file(tmp_path / 'a.feature', ['Given I have 2 apples', 'When I eat 1 apple'])
+    write_feature_file(tmp_path / 'sub' / 'b.feature', ['Given I have 12 apples', 'Then I have 11 apples'])
+    (tmp_path / 'sub' / 'invalid.feature').write_text("not a feature", encoding='utf-8')
+    (tmp_path / 'sub' / 'notes.txt').write_text("not a feature", encoding='utf-8')
+    errors = []
+
+    # Act
+    result = process_feature_files([str(tmp_path)], jobs=jobs, errors=errors)
+
+    # Assert
+    assert [(kw['type'], kw['keyword']) for kw in result['keywords']] == [
+        ('Context', 'I have 12 apples'),
+        ('Action', 'I eat 1 apple'),
+        ('Outcome', 'I have 11 apples')
+    ]
+    assert len(errors) == 1
+    assert 'invalid.feature' in errors[0]
+
+
+def test_process_feature_files_stops_at_first_error_without_error_list(tmp_path):
+    """Test that an invalid file raises an error when no error list is provided"""
+    # Arrange
+    (tmp_path / 'invalid.feature').write_text("not a feature", encoding='utf-8')
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        process_feature_files([str(tmp_path)])
+
+
+def test_keyword_ids_are_stable(tmp_path):
+    """Test that the id of a keyword only depends on its type and condensed keyword"""
+    # Arrange
+    write_feature_file(tmp_path / 'a.feature', ['Given I have 2 apples'])
+
+    # Act
+    first = process_feature_files([str(tmp_path)])
+    second = process_feature_files([str(tmp_path)])
+
+    # Assert
+    assert first == second
+    assert first['keywords'][0]['id'] == get_keyword_id('Context', 'I have 123 apples')
+
+
+def test_cache_only_parses_modified_files(tmp_path):
+    """Test that the keywords of the unmodified files are read from the cache"""
+    # Arrange
+    write_feature_file(tmp_path / 'features' / 'a.feature', ['Given I have 2 apples'])
+    write_feature_file(tmp_path / 'features' / 'b.feature', ['Then I have 3 pears'])
+    cache_file = str(tmp_path / 'cache.json')
+    process_feature_files([str(tmp_path / 'features')], cache_file=cache_file)
+    # tamper the cached keywords of b.feature to detect whether the file is parsed again
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    for path, entry in cache['files'].items():
+        if path.endswith('b.feature'):
+            entry['keywords'][0]['keyword'] = 'cached'
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+
+    # Act
+    write_feature_file(tmp_path / 'features' / 'a.feature', ['Given I have 2 oranges'])
+    result = process_feature_files([str(tmp_path / 'features')], cache_file=cache_file)
+
+    # Assert
+    assert [kw['keyword'] for kw in result['keywords']] == ['I have 2 oranges', 'cached']
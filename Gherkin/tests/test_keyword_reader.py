@@ -0,0 +1,50 @@
+import json
+import pytest
+from .. import keyword_reader
+from ..keyword_reader import read_keywords
+
+KEYWORDS = [
+    {'id': '1', 'type': 'Context', 'keyword': 'I have "2" apples', 'description': 'The basket {contains} [apples]'},
+    {'id': '2', 'type': 'Action', 'keyword': 'I eat 1 apple', 'description': ''},
+    {'id': '3', 'type': 'Outcome', 'keyword': 'I have 1 apple', 'description': 'Préférence: été'}
+]
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    """Fixture to read the files by tiny blocks, so that the values are split across blocks."""
+    monkeypatch.setattr(keyword_reader, 'block_size', 7)
+
+def test_read_json_file(tmp_path, small_blocks):
+    """Test reading the keywords of a JSON file incrementally."""
+    file_path = tmp_path / 'keywords.json'
+    file_path.write_text(json.dumps({'version': 12345, 'keywords': KEYWORDS, 'other': [1.5, {'a': None}]}, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    assert list(read_keywords(str(file_path))) == KEYWORDS
+
+def test_read_empty_json_file(tmp_path):
+    """Test reading a JSON file without keywords."""
+    file_path = tmp_path / 'keywords.json'
+    file_path.write_text('{ "keywords": [ ] }', encoding='utf-8')
+
+    assert list(read_keywords(str(file_path))) == []
+
+def test_read_ndjson_file(tmp_path):
+    """Test reading the keywords of an NDJSON file, the empty lines being ignored."""
+    file_path = tmp_path / 'keywords.ndjson'
+    file_path.write_text('\n'.join(json.dumps(keyword) for keyword in KEYWORDS) + '\n\n', encoding='utf-8')
+
+    assert list(read_keywords(str(file_path))) == KEYWORDS
+
+@pytest.mark.parametrize("content", [
+    '{"other": []}',
+    '{"keywords": [{"id": "1"}, 2]}',
+    '{"keywords": [{"id": "1"}',
+    '[{"id": "1"}]',
+])
+def test_invalid_json_files_are_rejected(tmp_path, small_blocks, content):
+    """Test that the invalid keyword files raise an error."""
+    file_path = tmp_path / 'keywords.json'
+    file_path.write_text(content, encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        list(read_keywords(str(file_path)))
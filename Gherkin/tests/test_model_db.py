@@ -7,6 +7,12 @@ from ..model_db import (
     add_model_and_host,
     get_model_and_host,
     get_model_id,
+    get_connection,
+    close_connection,
+    update_collection,
+    get_collections,
+    get_collection,
+    get_catalog_version,
     database_name
 )
 
@@ -123,3 +129,61 @@ def test_delete_database(test_db_path):
     
     delete_database(test_db_path)
     assert not os.path.exists(f"{test_db_path}/{database_name}")
+
+def test_connection_is_reused_in_wal_mode(test_db_path):
+    """Test that a single connection, in WAL mode, is used per database."""
+    setup_database(test_db_path)
+
+    conn = get_connection(test_db_path)
+    assert get_connection(test_db_path) is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    close_connection(test_db_path)
+    assert get_connection(test_db_path) is not conn
+
+def test_model_added_by_another_process_is_found(test_db_path):
+    """Test that the models kept in memory are refreshed when a model is not found."""
+    setup_database(test_db_path)
+    model_id = add_model_and_host(test_db_path, "gpt-4", None)
+    assert get_model_id(test_db_path, "gpt-4", None) == model_id
+
+    # Add a model with another connection, as another process would do
+    conn = sqlite3.connect(f"{test_db_path}/{database_name}")
+    conn.execute("INSERT INTO models (model, host) VALUES ('gpt-3.5', 'example_com')")
+    conn.commit()
+    other_id = conn.execute("SELECT id FROM models WHERE model = 'gpt-3.5'").fetchone()[0]
+    conn.close()
+
+    assert get_model_id(test_db_path, "gpt-3.5", "example_com") == other_id
+    assert get_model_and_host(test_db_path, other_id)["host"] == "example_com"
+
+def test_catalog(test_db_path):
+    """Test recording and listing the collections in the catalog."""
+    setup_database(test_db_path)
+    model_id = add_model_and_host(test_db_path, "gpt-4", "example_com")
+
+    update_collection(test_db_path, "chroma", model_id, "my_project", "Outcome", 384, 10, "fingerprint1")
+    update_collection(test_db_path, "chroma", model_id, "my_project", "Action", 384, 4, "fingerprint2")
+    update_collection(test_db_path, "numpy", model_id, "my_project", "Action", 384, 4, "fingerprint2")
+    update_collection(test_db_path, "chroma", model_id, "my_project", "Outcome", 384, 12, "fingerprint3")
+
+    collections = get_collections(test_db_path, "chroma")
+    assert [(c['keyword_type'], c['document_count'], c['fingerprint']) for c in collections] == [("Action", 4, "fingerprint2"), ("Outcome", 12, "fingerprint3")]
+    assert collections[0]['model'] == "gpt-4"
+    assert collections[0]['host'] == "example_com"
+    assert collections[0]['dimension'] == 384
+    assert get_collection(test_db_path, "numpy", model_id, "my_project", "Action")['document_count'] == 4
+    assert get_collection(test_db_path, "numpy", model_id, "my_project", "Outcome") is None
+
+def test_catalog_version_changes_when_a_collection_is_filled(test_db_path):
+    """Test that the version of the catalog changes when the content of a collection changes."""
+    setup_database(test_db_path)
+    model_id = add_model_and_host(test_db_path, "gpt-4", None)
+    update_collection(test_db_path, "chroma", model_id, "my_project", "Outcome", 384, 10, "fingerprint1")
+    version = get_catalog_version(test_db_path, "chroma")
+
+    update_collection(test_db_path, "numpy", model_id, "my_project", "Outcome", 384, 10, "fingerprint2")
+    assert get_catalog_version(test_db_path, "chroma") == version
+
+    update_collection(test_db_path, "chroma", model_id, "my_project", "Outcome", 384, 10, "fingerprint2")
+    assert get_catalog_version(test_db_path, "chroma") != version
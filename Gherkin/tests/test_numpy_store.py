@@ -0,0 +1,104 @@
+import os
+import pytest
+import numpy as np
+from ..numpy_store import (
+    NumpyClient,
+    directory_name
+)
+
+VECTORS = {
+    'north': [0.0, 1.0],
+    'north east': [1.0, 1.0],
+    'east': [1.0, 0.0],
+    'south': [0.0, -1.0],
+}
+
+def fake_embedding_function(texts: list[str]) -> list[list[float]]:
+    """Embed the name of a direction as its 2D vector."""
+    return [VECTORS[text] for text in texts]
+
+@pytest.fixture
+def collection(tmp_path):
+    """Fixture to provide a collection containing the four directions."""
+    client = NumpyClient(str(tmp_path))
+    collection = client.get_or_create_collection("1-my_project-Outcome", fake_embedding_function)
+    collection.upsert(ids=['1-k', '2-k', '3-k', '4-k'], documents=['north', 'north east', 'east', 'south'], metadatas=[{'hash': str(i)} for i in range(4)])
+    return collection
+
+def test_files_are_created(tmp_path, collection):
+    """Test that the collection is stored as a .npy matrix and a .json file."""
+    assert os.path.exists(f"{tmp_path}/{directory_name}/1-my_project-Outcome.npy")
+    assert os.path.exists(f"{tmp_path}/{directory_name}/1-my_project-Outcome.json")
+    matrix = np.load(f"{tmp_path}/{directory_name}/1-my_project-Outcome.npy")
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (4, 2)
+
+def test_list_and_get_collection(tmp_path, collection):
+    """Test listing and opening existing collections."""
+    client = NumpyClient(str(tmp_path))
+
+    assert client.list_collections() == ["1-my_project-Outcome"]
+    assert client.get_collection("1-my_project-Outcome").count() == 4
+    with pytest.raises(ValueError):
+        client.get_collection("1-my_project-Action")
+
+def test_query_returns_exact_nearest_neighbours(collection):
+    """Test that the query returns the nearest neighbours sorted by cosine distance."""
+    results = collection.query(query_embeddings=[[0.1, 1.0], [1.0, -0.1]], n_results=2)
+
+    assert results['ids'] == [['1-k', '2-k'], ['3-k', '2-k']]
+    assert results['documents'] == [['north', 'north east'], ['east', 'north east']]
+    assert results['distances'][0][0] == pytest.approx(1 - 1 / np.sqrt(1.01), abs=1e-6)
+    assert results['distances'][0][0] < results['distances'][0][1]
+
+def test_query_texts_are_embedded(collection):
+    """Test that the query texts are embedded with the embedding function."""
+    results = collection.query(query_texts=['south'], n_results=10)
+
+    assert results['ids'] == [['4-k', '3-k', '2-k', '1-k']]
+    assert results['distances'][0][0] == pytest.approx(0.0, abs=1e-6)
+
+def test_get_by_ids(collection):
+    """Test fetching some documents by ids, the unknown ones being ignored."""
+    results = collection.get(ids=['3-k', '5-k', '1-k'], include=['documents', 'metadatas'])
+
+    assert results['ids'] == ['3-k', '1-k']
+    assert results['documents'] == ['east', 'north']
+    assert results['metadatas'] == [{'hash': '2'}, {'hash': '0'}]
+    assert results['embeddings'] is None
+
+def test_get_with_limit_and_offset(collection):
+    """Test paginating the documents."""
+    results = collection.get(limit=2, offset=1, include=['documents'])
+
+    assert results['ids'] == ['2-k', '3-k']
+
+def test_upsert_replaces_existing_documents(tmp_path, collection):
+    """Test that upserting an existing id replaces its document and embedding."""
+    collection.upsert(ids=['1-k'], documents=['south'])
+
+    reopened = NumpyClient(str(tmp_path)).get_collection("1-my_project-Outcome")
+    assert reopened.count() == 4
+    assert reopened.get(ids=['1-k'], include=['documents'])['documents'] == ['south']
+    assert sorted(reopened.query(query_embeddings=[[0.0, -1.0]], n_results=2)['ids'][0]) == ['1-k', '4-k']
+
+def test_delete(tmp_path, collection):
+    """Test deleting documents."""
+    collection.delete(ids=['2-k', '4-k', '5-k'])
+
+    reopened = NumpyClient(str(tmp_path)).get_collection("1-my_project-Outcome")
+    assert reopened.get(include=['documents'])['documents'] == ['north', 'east']
+    assert reopened.query(query_embeddings=[[1.0, 0.5]], n_results=5)['ids'] == [['3-k', '1-k']]
+
+def test_dimension_mismatch_is_rejected(collection):
+    """Test that embeddings of another dimension cannot be added."""
+    with pytest.raises(ValueError):
+        collection.upsert(ids=['5-k'], documents=['up'], embeddings=[[0.0, 0.0, 1.0]])
+
+def test_delete_collection(tmp_path, collection):
+    """Test deleting a collection."""
+    client = NumpyClient(str(tmp_path))
+
+    client.delete_collection("1-my_project-Outcome")
+
+    assert client.list_collections() == []
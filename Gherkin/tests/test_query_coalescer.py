@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import pytest
+from ..query_coalescer import QueryCoalescer
+
+@pytest.fixture
+def executor():
+    """Fixture to provide an executor running one search at a time."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield executor
+    executor.shutdown(wait=True)
+
+def test_results_are_cached(executor):
+    """Test that a search which has already been run is not run again."""
+    calls = []
+    coalescer = QueryCoalescer(lambda: executor)
+
+    for _ in range(3):
+        assert coalescer.submit('key', lambda query: calls.append(query) or query.upper(), 'query').result() == 'QUERY'
+
+    assert calls == ['query']
+
+def test_cache_is_bounded(executor):
+    """Test that the least recently used results are evicted."""
+    calls = []
+    coalescer = QueryCoalescer(lambda: executor, max_size=2)
+
+    for key in ['a', 'b', 'a', 'c', 'a', 'b']:
+        coalescer.submit(key, lambda value: calls.append(value) or value, key).result()
+
+    assert calls == ['a', 'b', 'c', 'b']
+
+def test_identical_searches_in_flight_are_run_once(executor):
+    """Test that identical searches submitted while the first one is running share its results."""
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+    def search(query):
+        calls.append(query)
+        started.set()
+        release.wait()
+        return query
+    coalescer = QueryCoalescer(lambda: executor, max_size=0)
+
+    first = coalescer.submit('key', search, 'query')
+    started.wait()
+    second = coalescer.submit('key', search, 'query')
+    release.set()
+
+    assert first is second
+    assert second.result() == 'query'
+    assert calls == ['query']
+
+def test_superseded_search_is_cancelled(executor):
+    """Test that the pending search of a client is cancelled when the client sends a new one."""
+    release = threading.Event()
+    coalescer = QueryCoalescer(lambda: executor)
+    blocker = coalescer.submit('blocker', release.wait)
+
+    old = coalescer.submit('old', str.upper, 'old', client='client', seq=1)
+    new = coalescer.submit('new', str.upper, 'new', client='client', seq=2)
+    release.set()
+
+    assert blocker.result()
+    assert new.result() == 'NEW'
+    with pytest.raises(CancelledError):
+        old.result()
+    assert coalescer.is_superseded('client', 1)
+    assert not coalescer.is_superseded('client', 2)
+
+def test_late_search_is_rejected(executor):
+    """Test that a search older than the latest one of the client is not run."""
+    coalescer = QueryCoalescer(lambda: executor)
+
+    assert coalescer.submit('new', str.upper, 'new', client='client', seq=2).result() == 'NEW'
+    assert coalescer.submit('old', str.upper, 'old', client='client', seq=1) is None
+
+def test_search_shared_with_another_client_is_not_cancelled(executor):
+    """Test that a search is kept while another client is waiting for it."""
+    release = threading.Event()
+    coalescer = QueryCoalescer(lambda: executor)
+    blocker = coalescer.submit('blocker', release.wait)
+
+    shared = coalescer.submit('shared', str.upper, 'shared', client='first', seq=1)
+    coalescer.submit('shared', str.upper, 'shared', client='second', seq=1)
+    coalescer.submit('other', str.upper, 'other', client='first', seq=2)
+    release.set()
+
+    assert blocker.result()
+    assert shared.result() == 'SHARED'
+
+def test_clients_are_bounded(executor):
+    """Test that only the latest searches of the most recently active clients are remembered."""
+    coalescer = QueryCoalescer(lambda: executor, max_clients=3)
+
+    for index in range(100):
+        coalescer.submit('key', lambda: 'result', client=f'client{index}', seq=1).result()
+
+    assert len(coalescer._latest) == 3
+    assert coalescer.is_superseded('client99', 0)
+    assert not coalescer.is_superseded('client0', 0)
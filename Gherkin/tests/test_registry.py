@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+import pytest
+
+# the registry imports the Chroma embedding function types
+pytest.importorskip("chromadb")
+
+from .. import registry
+
+model_size = 100
+
+@pytest.fixture
+def test_db_path(tmp_path, monkeypatch):
+    """Fixture to provide a temporary database containing the models a, b, and c, and an empty registry whose models use 100 bytes each."""
+    db_path = str(tmp_path)
+    registry.model_db.setup_database(db_path)
+    for model in ['a', 'b', 'c']:
+        registry.model_db.add_model_and_host(db_path, model, None)
+    monkeypatch.setattr(registry, '_embedding_functions', {})
+    monkeypatch.setattr(registry, '_entries', OrderedDict())
+    monkeypatch.setattr(registry, '_memory_budget', None)
+    monkeypatch.setattr(registry.common_embed, 'build_embedding_function', lambda host, model: (lambda input: [[1.0]] * len(input)))
+    monkeypatch.setattr(registry, '_estimate_memory', lambda embedding_function: model_size)
+    return db_path
+
+def use_model(db_path: str, model: str) -> None:
+    """Use a model, as a search does."""
+    registry.get_model_id(db_path, model, None)
+    registry.get_embedding_function(db_path, model, None)
+
+def get_loaded_models() -> list[str]:
+    """Return the names of the models whose embedding function is loaded."""
+    return sorted(model for (model, _) in registry._embedding_functions.keys())
+
+def test_least_recently_used_model_is_evicted(test_db_path):
+    """Test that, when the memory budget is exceeded, the least recently used model is evicted."""
+    registry.set_memory_budget(2 * model_size)
+    use_model(test_db_path, 'a')
+    use_model(test_db_path, 'b')
+    use_model(test_db_path, 'a')
+
+    use_model(test_db_path, 'c')
+
+    assert get_loaded_models() == ['a', 'c']
+    assert [key[1] for key in registry._entries.keys()] == ['a', 'c']
+
+def test_loaded_model_is_kept_even_if_over_budget(test_db_path):
+    """Test that the model which has just been loaded is never evicted, even if it alone exceeds the budget."""
+    registry.set_memory_budget(model_size // 2)
+    use_model(test_db_path, 'a')
+
+    use_model(test_db_path, 'b')
+
+    assert get_loaded_models() == ['b']
+
+def test_lowering_the_budget_evicts_models(test_db_path):
+    """Test that lowering the memory budget immediately evicts the least recently used models."""
+    for model in ['a', 'b', 'c']:
+        use_model(test_db_path, model)
+
+    registry.set_memory_budget(model_size)
+
+    assert get_loaded_models() == ['c']
+
+def test_model_is_loaded_without_blocking_the_registry(test_db_path, monkeypatch):
+    """Test that a model being loaded does not block the use of the already loaded models, and is loaded only once."""
+    use_model(test_db_path, 'a')
+    loading = threading.Event()
+    release = threading.Event()
+    loads = []
+    def build_slowly(host, model):
+        loads.append(model)
+        loading.set()
+        release.wait(5)
+        return lambda input: [[1.0]] * len(input)
+    monkeypatch.setattr(registry.common_embed, 'build_embedding_function', build_slowly)
+    threads = [threading.Thread(target=use_model, args=(test_db_path, 'b')) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert loading.wait(5)
+
+    start = time.monotonic()
+    use_model(test_db_path, 'a')
+    elapsed = time.monotonic() - start
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert elapsed < 1
+    assert loads == ['b']
+    assert get_loaded_models() == ['a', 'b']
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+# vector_db imports the Chroma types even when the NumPy backend is used
+pytest.importorskip("chromadb")
+
+from .. import vector_db
+from ..common import get_collection_name
+
+# the modules used by vector_db (which imports its siblings by their plain names)
+registry = vector_db.registry
+model_db = vector_db.model_db
+
+class CountingEmbeddingFunction:
+    """Deterministic embedding function recording the texts it embeds."""
+
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, input):
+        self.texts.extend(input)
+        return [np.array([len(text), sum(map(ord, text)) % 97, 1.0], dtype=np.float32) for text in input]
+
+@pytest.fixture
+def embedding_function(monkeypatch):
+    """Fixture to provide the embedding function used by the fills instead of a real model."""
+    embedding_function = CountingEmbeddingFunction()
+    monkeypatch.setattr(registry, 'get_embedding_function', lambda db_path, model, host: embedding_function)
+    return embedding_function
+
+@pytest.fixture
+def test_db_path(tmp_path):
+    """Fixture to provide a temporary database path."""
+    db_path = str(tmp_path)
+    model_db.setup_database(db_path)
+    return db_path
+
+def make_keyword(id: str, keyword: str, description: str = '', type: str = 'Action') -> dict[str, str]:
+    """Build a keyword as read from a keyword file."""
+    return {'id': id, 'type': type, 'keyword': keyword, 'description': description}
+
+def fill(db_path: str, keywords: list[dict[str, str]], **kwargs) -> dict[str, int]:
+    """Fill the test project with the NumPy backend."""
+    return vector_db.fill_database_by_chunks(db_path, 'model', None, 'project', keywords, 'numpy', **kwargs)
+
+def get_documents(db_path: str, keyword_type: str = 'Action') -> dict[str, str]:
+    """Return the documents of a collection of the test project, indexed by internal id."""
+    model_id = model_db.get_model_id(db_path, 'model', None)
+    assert model_id is not None
+    collection = registry.get_client(db_path, 'numpy').get_collection(name=get_collection_name(model_id, 'project', keyword_type))
+    contents = collection.get(include=['documents'])
+    return dict(zip(contents['ids'], contents['documents']))
+
+def test_unchanged_texts_are_not_embedded_again(test_db_path, embedding_function):
+    """Test that a refill only embeds the new or modified documents."""
+    fill(test_db_path, [make_keyword('1', 'I pay', 'Pay the bill'), make_keyword('2', 'I leave')])
+    embedding_function.texts.clear()
+
+    statistics = fill(test_db_path, [make_keyword('1', 'I pay', 'Pay the whole bill'), make_keyword('2', 'I leave')])
+
+    assert embedding_function.texts == ['Pay the whole bill']
+    assert statistics['embedded'] == 1
+    assert statistics['skipped'] == 2
+
+def test_empty_description_is_deleted(test_db_path, embedding_function):
+    """Test that a keyword whose description becomes empty loses its description document."""
+    fill(test_db_path, [make_keyword('1', 'I pay', 'Pay the bill')])
+
+    statistics = fill(test_db_path, [make_keyword('1', 'I pay')])
+
+    assert statistics['deleted'] == 1
+    assert get_documents(test_db_path) == {'1-k': 'I pay'}
+
+def test_sync_deletes_removed_keywords(test_db_path, embedding_function):
+    """Test that a sync fill deletes the keywords (and descriptions) which are no longer in the keyword file."""
+    fill(test_db_path, [make_keyword('1', 'I pay', 'Pay the bill'), make_keyword('2', 'I leave'), make_keyword('3', 'I am home', type='Context')])
+
+    statistics = fill(test_db_path, [make_keyword('2', 'I leave')], sync=True)
+
+    assert statistics['deleted'] == 3
+    assert get_documents(test_db_path) == {'2-k': 'I leave'}
+    assert get_documents(test_db_path, 'Context') == {}
+
+def test_fill_without_sync_keeps_removed_keywords(test_db_path, embedding_function):
+    """Test that a fill without sync keeps the keywords which are no longer in the keyword file."""
+    fill(test_db_path, [make_keyword('1', 'I pay'), make_keyword('2', 'I leave')])
+
+    fill(test_db_path, [make_keyword('2', 'I leave')])
+
+    assert get_documents(test_db_path) == {'1-k': 'I pay', '2-k': 'I leave'}
+
+def test_resumed_fill_is_identical_to_full_fill(tmp_path, embedding_function):
+    """Test that a fill resumed after some written chunks produces the same collections as a full fill."""
+    keywords = [make_keyword(str(i), f'keyword {i}', f'description {i}' if i % 2 else '', ['Context', 'Action', 'Outcome'][i % 3]) for i in range(10)]
+    full_path = str(tmp_path / 'full')
+    resumed_path = str(tmp_path / 'resumed')
+    model_db.setup_database(full_path)
+    model_db.setup_database(resumed_path)
+
+    fill(full_path, keywords, chunk_size=3)
+    # the interrupted fill has written the first two chunks
+    fill(resumed_path, keywords[:6], chunk_size=3)
+    embedding_function.texts.clear()
+    statistics = fill(resumed_path, keywords, chunk_size=3, first_chunk=2)
+
+    assert statistics['keywords'] == 4
+    assert sorted(embedding_function.texts) == sorted(text for keyword in keywords[6:] for text in [keyword['keyword'], keyword['description']] if text)
+    for keyword_type in ['Context', 'Action', 'Outcome']:
+        assert get_documents(resumed_path, keyword_type) == get_documents(full_path, keyword_type)
@@ -1,17 +1,20 @@
-import chromadb
+import time
+from typing import Callable, Iterable
+
 from chromadb.api.types import IncludeEnum
-from chromadb.config import Settings
 
 import common
 import model_db
-import common_embed
+import registry
+import vector_store
 
-def fill_database(db_path: str, model: str, host: str|None, project: str, data: dict) -> None:
+def fill_database(db_path: str, model: str, host: str|None, project: str, data: dict, backend: str = "chroma") -> dict[str, int]:
     """
-    Fill a Chroma database with keywords and their descriptions.
+    Fill a vector database with keywords and their descriptions.
+    The hash of each document is stored in its metadata, so that only the new or modified documents are embedded.
 
     Args:
-        db_path: The path to the Chroma database.
+        db_path: The path to the database.
         model: The name of the model.
         host: The host of the model.
         project: The name of the project.
@@ -21,41 +24,186 @@ def fill_database(db_path: str, model: str, host: str|None, project: str, data:
                 type (str): The type of the keyword (Context, Action, or Outcome).
                 keyword (str): The keyword itself.
                 description (str): The description of the keyword (optional).
+        backend: The kind of vector store ('chroma' or 'numpy').
+
+    Returns:
+        A dictionary with the following keys:
+            - skipped: The number of documents which were already up to date.
+            - embedded: The number of documents which have been embedded (because they are new or modified).
+            - deleted: The number of descriptions which have been deleted (because they are now empty).
+            - keywords: The number of keywords which have been processed.
+    """
+    return fill_database_by_chunks(db_path, model, host, project, data['keywords'], backend, chunk_size=max(1, len(data['keywords'])))
+
+def fill_database_by_chunks(db_path: str, model: str, host: str|None, project: str, keywords: Iterable[dict], backend: str = "chroma",
+                            chunk_size: int = 500, first_chunk: int = 0, on_chunk: Callable[[int, dict[str, int]], None]|None = None,
+                            sync: bool = False) -> dict[str, int]:
+    """
+    Fill a vector database with keywords and their descriptions, the keywords being read and written by chunks,
+    so that the memory used does not depend on the number of keywords.
+    The hash of each document is stored in its metadata, so that only the new or modified documents are embedded.
+
+    Args:
+        db_path: The path to the database.
+        model: The name of the model.
+        host: The host of the model.
+        project: The name of the project.
+        keywords: The keywords (as described in fill_database), they may be read lazily.
+        backend: The kind of vector store ('chroma' or 'numpy').
+        chunk_size: The number of keywords written at once.
+        first_chunk: The index of the first chunk to write, the previous chunks are read but not written
+                     (to resume a fill which has been interrupted after writing them).
+        on_chunk: The function called after each chunk has been written, with the index of the chunk and the statistics so far.
+        sync: If True, the documents of the project which do not correspond to one of the keywords (or to one of their descriptions)
+              are deleted once all the keywords have been written.
 
     Returns:
-        None
+        The statistics, as described in fill_database (the chunks which are not written are not counted,
+        the deleted documents include the ones deleted by sync).
     """
-    # Initialize Chroma client
-    chroma_client = chromadb.PersistentClient(path=db_path, settings=Settings(anonymized_telemetry=False))
-    embedding_function = common_embed.build_embedding_function(host, model)
+    # Get the vector store client and the embedding function
+    client = registry.get_client(db_path, backend)
+    embedding_function = registry.get_embedding_function(db_path, model, host)
 
-    model_id = model_db.get_model_id(db_path, model, host)
+    model_id = registry.get_model_id(db_path, model, host)
     if not model_id:
         model_id = model_db.add_model_and_host(db_path, model, host)
 
-    for type in ["Context", "Action", "Outcome"]:
-        keywords = [item for item in data['keywords'] if item['type'] == type]
-        if keywords != []:
-            collection = chroma_client.get_or_create_collection(name=f"{common.get_collection_name(model_id, project, type)}", embedding_function=embedding_function)
-            collection.upsert(documents=[item['keyword'] for item in keywords], ids=[f"{item['id']}-k" for item in keywords])
-            documented_keywords = [item for item in keywords if len(item['description']) > 0]
-            if documented_keywords != []:
-                collection.upsert(documents=[item['description'] for item in documented_keywords], ids=[f"{item['id']}-d" for item in documented_keywords])
+    statistics = { 'skipped': 0, 'embedded': 0, 'deleted': 0, 'keywords': 0 }
+    collections = {}
+    modified_types = set()  # the types whose collection has been modified, so its catalog entry must be refreshed
+    expected_ids: dict[str, set[str]] = { type: set() for type in ["Context", "Action", "Outcome"] }
+    for index, chunk in enumerate(common.split_into_chunks(keywords, chunk_size)):
+        for type in ["Context", "Action", "Outcome"]:
+            type_keywords = [item for item in chunk if item['type'] == type]
+            if sync:
+                for item in type_keywords:
+                    expected_ids[type].add(f"{item['id']}-k")
+                    if len(item['description']) > 0:
+                        expected_ids[type].add(f"{item['id']}-d")
+            if type_keywords != []:
+                if type not in collections:
+                    collections[type] = client.get_or_create_collection(name=f"{common.get_collection_name(model_id, project, type)}", embedding_function=embedding_function)
+                if index >= first_chunk:
+                    modified_before = statistics['embedded'] + statistics['deleted']
+                    write_keywords(collections[type], type_keywords, statistics)
+                    if statistics['embedded'] + statistics['deleted'] > modified_before:
+                        modified_types.add(type)
+        if index >= first_chunk:
+            statistics['keywords'] += len(chunk)
+            if on_chunk is not None:
+                on_chunk(index, statistics)
+
+    if sync:
+        # Delete the documents which are no longer expected (also from the collections which have not been written)
+        existing_names = client.list_collections()
+        for type, ids in expected_ids.items():
+            name = common.get_collection_name(model_id, project, type)
+            if (type not in collections) and (name in existing_names):
+                collections[type] = client.get_collection(name=name, embedding_function=embedding_function)
+            if type in collections:
+                deleted = delete_stale_documents(collections[type], ids)
+                statistics['deleted'] += deleted
+                if deleted > 0:
+                    modified_types.add(type)
 
-    return
+    # Refreshing a catalog entry reads the whole collection, so it is skipped if the collection is unchanged and already catalogued
+    # (when resuming, the interrupted fill may have modified the collections without refreshing their entries)
+    for type, collection in collections.items():
+        if (first_chunk > 0) or (type in modified_types) or (model_db.get_collection(db_path, backend, model_id, project, type) is None):
+            update_catalog(db_path, backend, model_id, project, type, collection)
 
-def search_keywords(db_path: str, host: str|None, model: str, project: str, keyword_type: str, keyword: str, nb_results:int) -> list[dict[str, str]]:
+    return statistics
+
+def write_keywords(collection, keywords: list[dict], statistics: dict[str, int]) -> None:
     """
-    Extract the nearest neighbours of a keyword from a Chroma database.
+    Write some keywords of the same type, and their descriptions, in their collection.
+    Only the new or modified documents are embedded, the descriptions which are now empty are deleted.
 
     Args:
-        db_path: The path to the Chroma database.
+        collection: The collection.
+        keywords: The keywords, as described in fill_database.
+        statistics: The statistics (as described in fill_database) which are updated.
+    """
+    # Compute the expected documents and the descriptions which should not exist
+    documents = {}
+    for item in keywords:
+        documents[f"{item['id']}-k"] = item['keyword']
+        if len(item['description']) > 0:
+            documents[f"{item['id']}-d"] = item['description']
+    empty_description_ids = [f"{item['id']}-d" for item in keywords if len(item['description']) == 0]
+
+    # Compare with the hashes of the documents currently in the collection
+    existing = collection.get(ids=list(documents.keys()) + empty_description_ids, include=[IncludeEnum.metadatas])
+    assert existing['metadatas'] is not None
+    existing_hashes = { id: (metadata or {}).get('hash') for id, metadata in zip(existing['ids'], existing['metadatas']) }
+    modified_ids = [id for id, text in documents.items() if existing_hashes.get(id) != common.get_content_hash(text)]
+    deleted_ids = [id for id in empty_description_ids if id in existing_hashes]
+
+    if modified_ids != []:
+        collection.upsert(documents=[documents[id] for id in modified_ids],
+                          metadatas=[{ 'hash': common.get_content_hash(documents[id]) } for id in modified_ids],
+                          ids=modified_ids)
+    if deleted_ids != []:
+        collection.delete(ids=deleted_ids)
+
+    statistics['skipped'] += len(documents) - len(modified_ids)
+    statistics['embedded'] += len(modified_ids)
+    statistics['deleted'] += len(deleted_ids)
+
+def delete_stale_documents(collection, expected_ids: set[str]) -> int:
+    """
+    Delete the documents of a collection which are not expected.
+
+    Args:
+        collection: The collection.
+        expected_ids: The internal ids of the documents which should be kept.
+
+    Returns:
+        The number of deleted documents.
+    """
+    existing = collection.get(include=[])
+    stale_ids = [id for id in existing['ids'] if id not in expected_ids]
+    if stale_ids != []:
+        collection.delete(ids=stale_ids)
+    return len(stale_ids)
+
+def update_catalog(db_path: str, backend: str, model_id: int, project: str, keyword_type: str, collection) -> None:
+    """
+    Record the current state (dimension, number of documents, and fingerprint) of a collection in the catalog of the model database.
+
+    Args:
+        db_path: The path to the database.
+        backend: The kind of vector store ('chroma' or 'numpy').
+        model_id: The ID of the model.
+        project: The name of the project.
+        keyword_type: The type of keyword.
+        collection: The collection.
+    """
+    contents = collection.get(include=[IncludeEnum.documents, IncludeEnum.metadatas])
+    assert contents['documents'] is not None
+    assert contents['metadatas'] is not None
+    dimension = None
+    if len(contents['ids']) > 0:
+        embeddings = collection.get(limit=1, include=[IncludeEnum.embeddings])
+        assert embeddings['embeddings'] is not None
+        dimension = len(embeddings['embeddings'][0])
+    fingerprint = common.get_collection_fingerprint(contents['ids'], contents['documents'], contents['metadatas'])
+    model_db.update_collection(db_path, backend, model_id, project, keyword_type, dimension, len(contents['ids']), fingerprint)
+
+def search_keywords(db_path: str, host: str|None, model: str, project: str, keyword_type: str, keyword: str, nb_results:int, backend: str = "chroma") -> list[dict[str, str]]:
+    """
+    Extract the nearest neighbours of a keyword from a vector database.
+
+    Args:
+        db_path: The path to the database.
         host: The host of the model.
         model: The name of the model.
         project: The name of the project.
         keyword_type: The type of keyword to extract.
         keyword: The keyword to search for.
         nb_results: The number of results to return.
+        backend: The kind of vector store ('chroma' or 'numpy').
 
     Returns:
         A list of dictionaries with the following keys:
@@ -70,58 +218,131 @@ def search_keywords(db_path: str, host: str|None, model: str, project: str, keyw
         ValueError: If the model and/or project do not exist in the database.
     """
 
-    # Extract the model id
-    model_id = model_db.get_model_id(db_path, model, host)
-    if not model_id:
-        raise ValueError(f"Model {model} at host {host} do not exist in SQLite database {db_path}.")
+    return search_keywords_batch(db_path, host, model, project, [(keyword_type, keyword)], nb_results, backend)[0]
 
-    # Initialize Chroma client
-    chroma_client = chromadb.PersistentClient(path=db_path, settings=Settings(anonymized_telemetry=False))
+def search_keywords_batch(db_path: str, host: str|None, model: str, project: str, queries: list[tuple[str, str]], nb_results:int, backend: str = "chroma", timings: dict[str, float]|None = None) -> list[list[dict[str, str]]]:
+    """
+    Extract the nearest neighbours of several keywords from a vector database.
+    All the keywords are embedded in a single call of the embedding function, then a single query is performed per collection.
+
+    Args:
+        db_path: The path to the database.
+        host: The host of the model.
+        model: The name of the model.
+        project: The name of the project.
+        queries: The searches to perform, as a list of (keyword type, keyword) tuples.
+        nb_results: The number of results to return per keyword.
+        backend: The kind of vector store ('chroma' or 'numpy').
+        timings: If provided, the durations (in seconds) of the stages of the search are added to its 'embed' (computation of the embeddings),
+                 'query' (queries of the collections), and 'partner' (fetching of the partner documents) entries.
+
+    Returns:
+        For each query, in the same order, the list of the matches, as described in search_keywords.
+
+    Raises:
+        ValueError: If the model and/or project do not exist in the database.
+    """
+    # Group the queries per keyword type, i.e. per collection
+    indexes_per_type: dict[str, list[int]] = {}
+    for i, (keyword_type, _) in enumerate(queries):
+        indexes_per_type.setdefault(keyword_type, []).append(i)
+
+    # Get the appropriate collections (the client, the embedding function, and the collections are kept warm by the registry)
+    collections = { keyword_type: registry.get_collection(db_path, model, host, project, keyword_type, backend) for keyword_type in indexes_per_type }
+
+    # Compute the embeddings of all the distinct keywords at once (those of a remote model may come from the embedding cache)
+    texts = list(dict.fromkeys(keyword for (_, keyword) in queries))
+    if texts == []:
+        return []
+    start = time.perf_counter()
+    embedding_function = registry.get_query_embedding_function(db_path, model, host)
+    embeddings = dict(zip(texts, embedding_function(texts)))
+    add_timing(timings, 'embed', start)
 
-    # Get the appropriate embedding function
-    embedding_function = common_embed.build_embedding_function(host, model)
+    data: list[list[dict[str, str]]] = [[] for _ in queries]
+    for keyword_type, indexes in indexes_per_type.items():
+        collection = collections[keyword_type]
 
-    # Get the appropriate collection
-    collection_name = f"{common.get_collection_name(model_id, project, keyword_type)}"
-    try:
-        collection = chroma_client.get_collection(
-            name=collection_name,
-            embedding_function=embedding_function
+        # Perform the search query
+        start = time.perf_counter()
+        search_results = collection.query(
+            query_embeddings=[embeddings[queries[i][1]] for i in indexes],
+            n_results=nb_results
         )
-    except ValueError as e:
-        raise ValueError(f"Error: Model {model} and/or project {project} do not exist in Chroma database {db_path}.") from e
+        add_timing(timings, 'query', start)
+        assert search_results['ids'] is not None
+        assert search_results['documents'] is not None
+        assert search_results['distances'] is not None
 
-    documents = collection.get(include=[IncludeEnum.documents])
-    assert documents['documents'] is not None
+        # Fetch the partner documents (the description of a matching keyword or the keyword of a matching description)
+        # which are not already in the search results
+        partner_ids = set()
+        for result_ids in search_results['ids']:
+            partner_ids.update(common.get_internal_id_of_partner(id) for id in result_ids if common.get_internal_id_of_partner(id) not in result_ids)
+        start = time.perf_counter()
+        partner_documents = get_documents(collection, list(partner_ids))
+        add_timing(timings, 'partner', start)
+
+        # Process the search results
+        for j, i in enumerate(indexes):
+            data[i] = build_matches(search_results['ids'][j], search_results['documents'][j], search_results['distances'][j], partner_documents)
 
-    # Perform the search query
-    search_results = collection.query(
-        query_texts=[keyword],
-        n_results=nb_results
-    )
-    assert search_results['ids'] is not None
-    assert search_results['documents'] is not None
-    assert search_results['distances'] is not None
+    return data
 
-    # Process the search results
+def add_timing(timings: dict[str, float]|None, stage: str, start: float) -> None:
+    """
+    Add the time elapsed since start (as returned by time.perf_counter) to the duration of a stage.
+    """
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start)
+
+def build_matches(result_ids: list[str], result_docs: list[str], result_dists: list[float], partner_documents: dict[str, str]) -> list[dict[str, str]]:
+    """
+    Build the matches of a keyword from the results of a query.
+
+    Args:
+        result_ids: The internal ids of the found documents.
+        result_docs: The texts of the found documents.
+        result_dists: The distances of the found documents.
+        partner_documents: The texts of the partners of the found documents which are not themselves in the found documents.
+
+    Returns:
+        The list of the matches, as described in search_keywords.
+    """
+    found = { result_ids[i]: (result_docs[i], result_dists[i]) for i in range(len(result_ids)) }
     data = []
-    result_ids = search_results['ids'][0]
-    result_docs = search_results['documents'][0]
-    result_dists = search_results['distances'][0]
     for i in range(len(result_ids)):
+        partner_id = common.get_internal_id_of_partner(result_ids[i])
         if common.get_document_type(result_ids[i]) == 'keyword':
             d = { 'id': common.get_external_id(result_ids[i]), 'match': 'keyword', 'keyword': result_docs[i], 'keyword_distance': result_dists[i]}
-            description_id = common.get_internal_id_of_description(result_ids[i])
-            if description_id in documents['ids']:
-                d['description'] = documents['documents'][documents['ids'].index(description_id)]
-                if description_id in result_ids:
-                    d['description_distance'] = result_dists[result_ids.index(description_id)]
+            if partner_id in found:
+                d['description'] = found[partner_id][0]
+                d['description_distance'] = found[partner_id][1]
+            elif partner_id in partner_documents:
+                d['description'] = partner_documents[partner_id]
         else:
             d = { 'id': common.get_external_id(result_ids[i]), 'match': 'description', 'description': result_docs[i], 'description_distance': result_dists[i]}
-            keyword_id = common.get_internal_id_of_keyword(result_ids[i])
-            d['keyword'] = documents['documents'][documents['ids'].index(keyword_id)]
-            if keyword_id in result_ids:
-                d['keyword_distance'] = result_dists[result_ids.index(keyword_id)]
+            if partner_id in found:
+                d['keyword'] = found[partner_id][0]
+                d['keyword_distance'] = found[partner_id][1]
+            else:
+                d['keyword'] = partner_documents[partner_id]
         data.append(d)
-
     return data
+
+def get_documents(collection: vector_store.VectorCollection, ids: list[str]) -> dict[str, str]:
+    """
+    Fetch some documents of a collection given their ids.
+
+    Args:
+        collection: The collection.
+        ids: The internal ids of the documents, the unknown ones are ignored.
+
+    Returns:
+        A dictionary mapping the internal id of each found document to its text.
+    """
+    if ids == []:
+        return {}
+    documents = collection.get(ids=ids, include=[IncludeEnum.documents])
+    assert documents['documents'] is not None
+    return dict(zip(documents['ids'], documents['documents']))
@@ -0,0 +1,51 @@
+from typing import Any, Protocol
+
+import chromadb
+from chromadb.config import Settings
+
+import numpy_store
+
+# The vector stores which can hold the embeddings of the keywords and descriptions:
+# - chroma: a Chroma persistent database (approximate search with an HNSW index)
+# - numpy: a NumPy matrix per collection (exact search, faster for small and medium libraries)
+backends = ["chroma", "numpy"]
+
+class VectorCollection(Protocol):
+    """
+    The collection operations used by this project (a subset of the Chroma Collection API).
+    """
+    name: str
+    def count(self) -> int: ...
+    def get(self, ids: Any = None, limit: int|None = None, offset: int|None = None, include: Any = ...) -> Any: ...
+    def upsert(self, ids: Any, documents: Any = None, metadatas: Any = None, embeddings: Any = None) -> None: ...
+    def delete(self, ids: Any = None) -> None: ...
+    def query(self, query_embeddings: Any = None, query_texts: Any = None, n_results: int = 10, include: Any = ...) -> Any: ...
+
+class VectorStore(Protocol):
+    """
+    The client operations used by this project (a subset of the Chroma Client API).
+    """
+    def list_collections(self) -> Any: ...
+    def get_collection(self, name: str, embedding_function: Any = None) -> Any: ...
+    def get_or_create_collection(self, name: str, embedding_function: Any = None) -> Any: ...
+    def delete_collection(self, name: str) -> None: ...
+
+def open_store(db_path: str, backend: str) -> VectorStore:
+    """
+    Open the vector store of a database.
+
+    Args:
+        db_path: The path to the database directory.
+        backend: The kind of vector store ('chroma' or 'numpy').
+
+    Returns:
+        The vector store.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "chroma":
+        return chromadb.PersistentClient(path=db_path, settings=Settings(anonymized_telemetry=False))
+    if backend == "numpy":
+        return numpy_store.NumpyClient(db_path)
+    raise ValueError(f"Unknown backend ({backend})")